@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the hot paths of mime, written as JSON so that runs on two
+commits can be compared:
+
+  python benchmarks/run.py -o before.json
+  git checkout other-branch
+  python benchmarks/run.py --compare before.json
+
+Every timing is the best and the median of --repeat runs, in nanoseconds
+per operation (startup benchmarks: per import, in a fresh interpreter).
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from functools import cmp_to_key
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from mime import Type, Types  # noqa: E402
+from mime.mime_types import MIMETypes, default_type_files  # noqa: E402
+from mime.type import _simplify  # noqa: E402
+
+
+def measure(func, number, repeat):
+    times = sorted(timeit.repeat(func, number=number, repeat=repeat))
+    return {'best_ns': times[0] / number * 1e9,
+            'median_ns': times[len(times) // 2] / number * 1e9,
+            'number': number}
+
+
+def measure_startup(env, repeat):
+    code = 'import mime; mime.Types.count()'
+    environ = dict(os.environ, PYTHONPATH=ROOT_DIR, **env)
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', code], env=environ)
+        times.append(time.time() - start)
+    # Subtract the cost of starting the interpreter itself.
+    base = min(timeit.repeat(
+        lambda: subprocess.check_call([sys.executable, '-c', 'pass']),
+        number=1, repeat=repeat))
+    times.sort()
+    return {'best_ns': (times[0] - base) * 1e9,
+            'median_ns': (times[len(times) // 2] - base) * 1e9,
+            'number': 1}
+
+
+def bench_startup(repeat):
+    snapshot_dir = tempfile.mkdtemp()
+    snapshot_file = os.path.join(snapshot_dir, 'types.snapshot')
+    results = {'startup_text': measure_startup(
+        {'MIME_TYPES_LAZY': '0', 'MIME_TYPES_SNAPSHOT': snapshot_file}, repeat)}
+    try:
+        MIMETypes.dump_snapshot(snapshot_file)
+        results['startup_snapshot'] = measure_startup(
+            {'MIME_TYPES_LAZY': '0', 'MIME_TYPES_SNAPSHOT': snapshot_file},
+            repeat)
+    finally:
+        os.remove(snapshot_file)
+        os.rmdir(snapshot_dir)
+    return results
+
+
+def bench_load(repeat):
+    type_files = default_type_files()
+    lines = 0
+    for type_file in type_files:
+        with open(type_file) as fd:
+            lines += sum(1 for _ in fd)
+
+    def load():
+        registry = Types()
+        for type_file in type_files:
+            MIMETypes.load_from_file(type_file, registry)
+    result = measure(load, 1, repeat)
+    result['files'] = len(type_files)
+    result['lines'] = lines
+    result['lines_per_s'] = lines / (result['best_ns'] / 1e9)
+    return {'load_from_file_all': result}
+
+
+def bench_lookups(repeat):
+    Types.load()
+    plain = Types['text/plain'][0]
+    regex = re.compile('^image/.*png$')
+    types = list(Types.defined_types())
+    return {
+        'getitem_str': measure(lambda: Types['text/plain'], 100000, repeat),
+        'getitem_type': measure(lambda: Types[plain], 100000, repeat),
+        'getitem_regex': measure(lambda: Types[regex], 100, repeat),
+        'type_for': measure(lambda: Types.type_for('/srv/www/logo.png'),
+                            100000, repeat),
+        'type_for_unknown': measure(lambda: Types.type_for('a.zzz'),
+                                    100000, repeat),
+        'simplify_cached': measure(lambda: Type.simplify('x-appl/x-zip'),
+                                   100000, repeat),
+        'simplify_uncached': measure(lambda: _simplify('x-appl/x-zip'),
+                                     100000, repeat),
+        'priority_sort': dict(
+            measure(lambda: sorted(types, key=cmp_to_key(Type.priority_compare)),
+                    1, repeat),
+            types=len(types)),
+    }
+
+
+def bench_memory():
+    if tracemalloc is None:
+        return {}
+    type_files = default_type_files()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    mime_types = [t for f in type_files for t in MIMETypes.parse_file(f)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {'memory_per_type': {'bytes': (after - before) / float(len(mime_types)),
+                                'types': len(mime_types)}}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            stderr=open(os.devnull, 'w')).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(repeat):
+    results = {}
+    results.update(bench_startup(repeat))
+    results.update(bench_load(repeat))
+    results.update(bench_lookups(repeat))
+    results.update(bench_memory())
+    return {'revision': git_revision(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': repeat,
+            'results': results}
+
+
+def compare(old, new):
+    # Ratios above 1 mean the new run is slower (or bigger).
+    for name in sorted(new['results']):
+        (before, after) = (old['results'].get(name), new['results'][name])
+        if before is None:
+            continue
+        key = 'best_ns' if 'best_ns' in after else 'bytes'
+        print('%-20s %14.1f %14.1f %7.2fx' % (name, before[key], after[key],
+                                              after[key] / before[key]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-o', '--output', help='write the results to this file')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--compare', metavar='JSON',
+                        help='print the ratios to an earlier run')
+    args = parser.parse_args(argv)
+
+    report = run(args.repeat)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as fd:
+            fd.write(text + '\n')
+    if args.compare:
+        with open(args.compare) as fd:
+            compare(json.load(fd), report)
+    elif not args.output:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
-from .type import Type, Types
+from .type import Overlay, Type, Types
 from .mime_types import MIMETypes
+from .negotiation import negotiate
 from .version import VERSION
 
 
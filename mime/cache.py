@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple, OrderedDict
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+class LRUCache(object):
+    """
+    A bounded mapping that evicts the least recently used entry once it
+    holds more than maxsize entries, and counts hits and misses like
+    functools.lru_cache. It takes no lock: when threads race, the worst
+    outcome is a miss counted twice or an entry evicted a little early.
+      cache = LRUCache(2)
+      cache['a'] = 1
+      cache.get('a')   # => 1
+      cache.get('b')   # => None
+      cache.info()     # => CacheInfo(hits=1, misses=1, maxsize=2, currsize=1)
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __repr__(self):
+        return '<LRUCache %s>' % (self.info(),)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        data = self._data
+        try:
+            value = data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        data[key] = value
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        data = self._data
+        data[key] = value
+        while len(data) > self.maxsize:
+            try:
+                data.popitem(last=False)
+            except KeyError:
+                break
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
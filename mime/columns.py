@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Column-oriented queries over many MIME types at once, see Types.columns.
+  columns = Types.columns()
+  columns.select(media_type='image', registered=True, obsolete=False,
+                 binary=True)
+  # => [<MIME::Type image/bmp>, ...]
+  observed = Types.columns(['image/png', 'text/x-foo', 'application/pdf'])
+  observed.mask(binary=True)
+  # => array([ True, False,  True]), or [True, False, True] without NumPy
+With NumPy installed the columns are arrays and every criterion is one
+vectorized comparison; without it they are tuples and an array of flags,
+and value criteria go through an index of the rows holding each value.
+"""
+from array import array
+from itertools import compress
+from .type import (FLAG_BINARY, FLAG_COMPLETE, FLAG_MASK, FLAG_OBSOLETE,
+                   FLAG_PLATFORM, FLAG_REGISTERED, FLAG_SIGNATURE, FLAG_SYSTEM)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Set in the flags column of every row that holds a type, so that rows of
+# unknown content types never match.
+KNOWN = FLAG_MASK + 1
+
+CRITERIA = {'registered': FLAG_REGISTERED,
+            'obsolete': FLAG_OBSOLETE,
+            'binary': FLAG_BINARY,
+            'signature': FLAG_SIGNATURE,
+            'system': FLAG_SYSTEM,
+            'platform': FLAG_PLATFORM,
+            'complete': FLAG_COMPLETE}
+
+
+def _flag_test(criteria):
+    # Folds the boolean criteria into a (bits, expected) pair: a row
+    # matches when flags & bits == expected.
+    (bits, expected) = (KNOWN, KNOWN)
+    for (name, value) in criteria.items():
+        if name not in CRITERIA:
+            raise TypeError('Unknown criterion %r' % name)
+        if value is not None:
+            bits |= CRITERIA[name]
+            if value:
+                expected |= CRITERIA[name]
+    return (bits, expected)
+
+
+class TypeColumns(object):
+    """
+    Parallel columns over a sequence of MIME::Types, one row per type;
+    None rows stand for content types that are not registered.
+    Columns: types, content_type, media_type, sub_type, encoding and
+    flags (Type#flags, plus KNOWN).
+    """
+
+    def __init__(self, types, use_numpy=None):
+        self.types = tuple(types)
+        self.numpy = numpy is not None if use_numpy is None else use_numpy
+
+        def column(attr):
+            return tuple('' if t is None else getattr(t, attr)
+                         for t in self.types)
+        self.content_type = column('content_type')
+        self.media_type = column('media_type')
+        self.sub_type = column('sub_type')
+        self.encoding = column('encoding')
+        flags = array('H', (0 if t is None else t.flags | KNOWN
+                            for t in self.types))
+        if self.numpy:
+            for name in ('content_type', 'media_type', 'sub_type', 'encoding'):
+                setattr(self, name, numpy.array(getattr(self, name), dtype=object))
+            flags = numpy.array(flags, dtype=numpy.uint16)
+        self.flags = flags
+        self._row_index = {}
+
+    def __len__(self):
+        return len(self.types)
+
+    def mask(self, media_type=None, sub_type=None, encoding=None, **criteria):
+        """
+        Returns one boolean per row, true for the types that match all the
+        given criteria: media_type, sub_type and encoding values, and
+        True/False for registered (as Type#is_registered), obsolete, binary,
+        signature, system, platform and complete. None ignores a criterion.
+        """
+        (bits, expected) = _flag_test(criteria)
+        values = [(column, value) for (column, value) in
+                  ((self.media_type, media_type), (self.sub_type, sub_type),
+                   (self.encoding, encoding)) if value is not None]
+        if self.numpy:
+            mask = (self.flags & bits) == expected
+            for (column, value) in values:
+                mask &= column == value
+            return mask
+        flags = self.flags
+        if not values:
+            return [row & bits == expected for row in flags]
+        # Only the rows holding the rarest of the wanted values are tested.
+        candidates = min((self._positions(column).get(value, ())
+                          for (column, value) in values), key=len)
+        mask = [False] * len(flags)
+        for i in candidates:
+            if flags[i] & bits == expected and all(
+                    column[i] == value for (column, value) in values):
+                mask[i] = True
+        return mask
+
+    def _positions(self, column):
+        # The row numbers of every value of column, built on first use.
+        positions = self._row_index.get(id(column))
+        if positions is None:
+            positions = {}
+            for (i, value) in enumerate(column):
+                positions.setdefault(value, []).append(i)
+            self._row_index[id(column)] = positions
+        return positions
+
+    def select(self, **criteria):
+        """Returns the types that match criteria, see #mask."""
+        return list(compress(self.types, self.mask(**criteria)))
+
+    def count(self, **criteria):
+        """Counts the types that match criteria, see #mask."""
+        return int(sum(self.mask(**criteria)))
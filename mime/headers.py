@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Parsing of MIME header values such as Content-Type and Accept, following
+the grammar of RFC 2045 section 5.1 and RFC 7231 sections 3.1.1.1 and 5.3:
+
+  media-type = type "/" subtype *( OWS ";" OWS parameter )
+  parameter  = token "=" ( token / quoted-string )
+  Accept     = #( media-range [ OWS ";" OWS "q=" qvalue *( accept-ext ) ] )
+"""
+import re
+
+try:
+    from types import MappingProxyType
+    EMPTY_PARAMS = MappingProxyType({})
+except ImportError:
+    EMPTY_PARAMS = {}
+
+
+TOKEN = r"[!#$%&'*+.^_`|~0-9A-Za-z-]+"
+MEDIA_RANGE_RE = re.compile(r'\s*(%s/%s)\s*' % (TOKEN, TOKEN))
+PARAMETER_RE = re.compile(r';\s*(%s)\s*=\s*(?:(%s)|"((?:[^"\\]|\\.)*)")\s*'
+                          % (TOKEN, TOKEN))
+EMPTY_PARAMETER_RE = re.compile(r';\s*(?=;|$)')
+QUOTED_PAIR_RE = re.compile(r'\\(.)')
+LIST_ELEMENT_RE = re.compile(r'(?:[^,"]|"(?:[^"\\]|\\.)*")+')
+
+
+class InvalidHeader(ValueError):
+    pass
+
+
+def parse_parameters(value, pos=0):
+    """
+    Parses the "; name=value" list starting at pos. Names are lowercased,
+    quoted values are unquoted, empty parameters are skipped and the first
+    of repeated names wins.
+    """
+    params = {}
+    end = len(value)
+    while pos < end:
+        match = PARAMETER_RE.match(value, pos)
+        if match is None:
+            match = EMPTY_PARAMETER_RE.match(value, pos)
+            if match is None:
+                raise InvalidHeader('Invalid parameter in "%s" at %d' % (value, pos))
+        else:
+            (name, token, quoted) = match.groups()
+            if token is None:
+                token = QUOTED_PAIR_RE.sub(r'\1', quoted)
+            params.setdefault(name.lower(), token)
+        pos = match.end()
+    return params
+
+
+def parse_content_type(value):
+    """
+    Splits a Content-Type header value into its "type/subtype" part and a
+    parameter mapping.
+      parse_content_type('text/html; charset="UTF-8"')
+      # => ('text/html', {'charset': 'UTF-8'})
+    Values without parameters take a fast path and share EMPTY_PARAMS,
+    a read-only mapping.
+    """
+    match = MEDIA_RANGE_RE.match(value)
+    if match is None:
+        raise InvalidHeader('Invalid media type "%s"' % value)
+    if match.end() == len(value):
+        return (match.group(1), EMPTY_PARAMS)
+    return (match.group(1), parse_parameters(value, match.end()))
+
+
+def parse_accept(value):
+    """
+    Splits an Accept header value into (media_range, params, q) triples in
+    header order, with q as a float and removed from params. Elements that
+    are malformed or have an invalid qvalue are skipped, as a server may
+    ignore them.
+      parse_accept('text/html, image/*;q=0.5')
+      # => [('text/html', {}, 1.0), ('image/*', {}, 0.5)]
+    """
+    ranges = []
+    for element in LIST_ELEMENT_RE.findall(value):
+        if not element.strip():
+            continue
+        try:
+            (media_range, params) = parse_content_type(element)
+        except InvalidHeader:
+            continue
+        if media_range.startswith('*/') and media_range != '*/*':
+            # Only */*, type/* and type/subtype are media ranges.
+            continue
+        q = 1.0
+        if 'q' in params:
+            params = dict(params)
+            try:
+                q = float(params.pop('q'))
+            except ValueError:
+                continue
+            if not 0 <= q <= 1:
+                continue
+        ranges.append((media_range, params, q))
+    return ranges
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Optional counters and timing histograms for type lookups and type file
+loading. Nothing is measured until enable() swaps timing wrappers in for
+Types[...], Types.type_for (and of), Types.match, Types.m,
+MIMETypes.parse_file and MIMETypes.load_from_file; disable() puts the
+originals back, so the instrumentation costs nothing while it is off.
+Files read from the snapshot are not parsed and are not listed.
+  from mime import instrumentation
+  instrumentation.enable()
+  ...
+  instrumentation.snapshot()
+  # => {'operations': {'type_for': {'count': 3, 'total': 4.1e-06,
+  #                                 'max': 2.2e-06,
+  #                                 'histogram': {'1e-06': 0, '2e-06': 2,
+  #                                               '5e-06': 1, ...}}, ...},
+  #     'files': {'/.../mime/types/image': {'parse_time': 0.0011,
+  #                                          'load_time': 0.0017,
+  #                                          'lines': 150, 'types': 148}}}
+The optional callback is called as callback(operation, seconds, detail)
+after every measured call, where detail is the type id, file name or
+pattern the call was given.
+"""
+from bisect import bisect_left
+from threading import Lock
+from timeit import default_timer
+from .mime_types import MIMETypes
+from .type import ItemMeta, Types, registrymethod
+
+
+# Upper bounds of the histogram buckets, in seconds; slower calls are
+# counted under 'inf'.
+BUCKETS = (1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4,
+           1e-3, 2e-3, 5e-3, 1e-2, 2e-2, 5e-2, 1e-1, 2e-1, 5e-1, 1.0)
+LABELS = tuple('%g' % bound for bound in BUCKETS) + ('inf',)
+
+_lock = Lock()
+_operations = {}
+_files = {}
+_callback = None
+_originals = None
+
+
+def _record(operation, seconds, detail):
+    with _lock:
+        stats = _operations.get(operation)
+        if stats is None:
+            stats = _operations[operation] = {
+                'count': 0, 'total': 0.0, 'max': 0.0,
+                'histogram': [0] * len(LABELS)}
+        stats['count'] += 1
+        stats['total'] += seconds
+        if seconds > stats['max']:
+            stats['max'] = seconds
+        stats['histogram'][bisect_left(BUCKETS, seconds)] += 1
+    if _callback is not None:
+        _callback(operation, seconds, detail)
+
+
+def _timed(operation, func):
+    # The detail is the first argument after the registry, however passed.
+    name = func.__code__.co_varnames[1]
+
+    def timed(registry, *args, **kwargs):
+        start = default_timer()
+        try:
+            return func(registry, *args, **kwargs)
+        finally:
+            _record(operation, default_timer() - start,
+                    args[0] if args else kwargs.get(name))
+    timed.__doc__ = func.__doc__
+    return timed
+
+
+def _timed_file(operation, func):
+    # parse_file also records the line and type counts of the file.
+    key = 'parse_time' if operation == 'parse_file' else 'load_time'
+
+    def timed(cls, type_file, *args, **kwargs):
+        start = default_timer()
+        try:
+            result = func(type_file, *args, **kwargs)
+        finally:
+            seconds = default_timer() - start
+            _record(operation, seconds, type_file)
+        stats = {key: seconds}
+        if operation == 'parse_file':
+            with open(type_file) as fd:
+                stats['lines'] = sum(1 for _ in fd)
+            stats['types'] = len(result)
+        with _lock:
+            _files.setdefault(type_file, {}).update(stats)
+        return result
+    timed.__doc__ = func.__doc__
+    return classmethod(timed)
+
+
+def enable(callback=None):
+    """
+    Starts measuring, calling callback(operation, seconds, detail) after
+    every measured call if given. Enabling again only replaces the
+    callback.
+    """
+    global _callback, _originals
+    _callback = callback
+    if _originals is not None:
+        return
+    _originals = (ItemMeta.__dict__['__getitem__'],
+                  dict((name, Types.__dict__[name])
+                       for name in ('__getitem__', 'type_for', 'of', 'match', 'm')),
+                  dict((name, MIMETypes.__dict__[name])
+                       for name in ('parse_file', 'load_from_file')))
+    ItemMeta.__getitem__ = _timed('getitem', _originals[0])
+    Types.__getitem__ = ItemMeta.__getitem__
+    for (name, method) in _originals[1].items():
+        if name != '__getitem__':
+            operation = 'type_for' if name == 'of' else name
+            setattr(Types, name, registrymethod(_timed(operation, method.__func__)))
+    for name in ('parse_file', 'load_from_file'):
+        setattr(MIMETypes, name,
+                _timed_file(name, getattr(MIMETypes, name)))
+
+
+def disable():
+    """Stops measuring and restores the original methods."""
+    global _callback, _originals
+    if _originals is None:
+        return
+    ItemMeta.__getitem__ = _originals[0]
+    for (name, method) in _originals[1].items():
+        setattr(Types, name, method)
+    for (name, method) in _originals[2].items():
+        setattr(MIMETypes, name, method)
+    _callback = _originals = None
+
+
+def is_enabled():
+    return _originals is not None
+
+
+def snapshot():
+    """
+    Returns the measurements so far as plain dicts, see the module
+    documentation.
+    """
+    with _lock:
+        operations = dict(
+            (name, dict(stats, histogram=dict(zip(LABELS, stats['histogram']))))
+            for (name, stats) in _operations.items())
+        files = dict((name, dict(stats)) for (name, stats) in _files.items())
+    return {'operations': operations, 'files': files}
+
+
+def reset():
+    with _lock:
+        _operations.clear()
+        _files.clear()
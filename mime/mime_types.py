@@ -1,13 +1,23 @@
 # -*- coding: utf-8 -*-
+import os
 import re
+import warnings
 from glob import glob
-from os.path import realpath, dirname, join
+from os.path import basename, realpath, dirname, join
+from threading import Event, RLock, Thread
+from . import snapshot
 from .type import Type, Types
 from .version import VERSION
 
 
 DIR = dirname(realpath(__file__))
 STARTUP = True
+# Set MIME_TYPES_LAZY=1 in the environment to defer parsing the type files
+# until the first lookup that needs them.
+LAZY = os.environ.get('MIME_TYPES_LAZY', '') not in ('', '0')
+# Precompiled registry written by "python -m mime.snapshot"; see dump_snapshot.
+SNAPSHOT_FILE = os.environ.get('MIME_TYPES_SNAPSHOT',
+                               join(DIR, 'types.snapshot'))
 
 TEXT_FORMAT_RE = re.compile("""
     ([*])?                                             # 0: Unregistered?
@@ -23,16 +33,19 @@ TEXT_FORMAT_RE = re.compile("""
 
 
 class MIMETypes(object):
-    _types = Types(VERSION)
 
     def __repr__(self):
         return '<MIMETypes version:%s>' % VERSION
 
     @classmethod
-    def load_from_file(cls, type_file):
+    def parse_file(cls, type_file):
+        """
+        Parses a type definition file and returns its types in file order,
+        without registering them.
+        """
         data = open(type_file).read()
         data = data.split('\n')
-        mime_types = Types()
+        mime_types = []
         for index, line in enumerate(data):
             item = line.strip()
             if not item:
@@ -40,13 +53,13 @@ class MIMETypes(object):
             try:
                 ret = TEXT_FORMAT_RE.match(item).groups()
             except Exception as e:
-                __parsing_error(type_file, index, line, e)
+                _parsing_error(type_file, index, line, e)
 
             (unregistered, obsolete, platform, mediatype, subtype, extensions,
              encoding, urls, docs, comment) = ret
             if mediatype is None:
                 if comment is None:
-                    __parsing_error(type_file, index, line, RuntimeError)
+                    _parsing_error(type_file, index, line, RuntimeError)
                 continue
             extensions = extensions and extensions.split(',') or []
             urls = urls and urls.split(',') or []
@@ -58,23 +71,266 @@ class MIMETypes(object):
             mime_type.registered = (not unregistered)
             mime_type.docs = docs
             mime_type.url = urls
-            mime_types.add(mime_type)
+            mime_types.append(mime_type)
         return mime_types
 
+    @classmethod
+    def load_from_file(cls, type_file, registry=Types):
+        registry.load_sources({type_file: cls.parse_file(type_file)})
+        return registry
+
+    @classmethod
+    def load_from_rows(cls, rows, registry=Types, source=None):
+        mime_types = [Type.from_row(row) for row in rows]
+        if source is None:
+            registry.add(*mime_types)
+        else:
+            registry.load_sources({source: mime_types})
+        return registry
+
+    @classmethod
+    def reload(cls, type_files=None, registry=Types):
+        """
+        Parses type_files again (by default every file registry has loaded)
+        and swaps their new definitions for the old ones in one step;
+        lookups carry on against the old index meanwhile. Files that no
+        longer exist lose their types. Nothing changes if any file fails
+        to parse. Returns the reloaded files.
+        """
+        if type_files is None:
+            type_files = list(registry.sources)
+        sources = {}
+        for type_file in type_files:
+            sources[type_file] = (cls.parse_file(type_file)
+                                  if os.path.exists(type_file) else [])
+        registry.load_sources(sources)
+        return type_files
+
+    @classmethod
+    def load_registry(cls, type_files=None, base=None, lazy=False):
+        """
+        Returns a new Types registry holding the types of type_files (all
+        of mime/types by default, none when base is given) on top of those
+        of base, see Types#__init__. Type files can be any files in the
+        mime/types format. A lazy registry parses them as its lookups need
+        them (see LazyLoader), which requires them to be named after their
+        media type as in mime/types. Per-tenant types are best kept out of
+        base and stacked over it, see Overlay:
+          tenant = Overlay(MIMETypes.load_registry(['/etc/tenant/types']),
+                           Types)
+        """
+        registry = Types(VERSION, base=base)
+        if type_files is None:
+            type_files = [] if base is not None else default_type_files()
+        if lazy:
+            registry.loader = LazyLoader(type_files, registry)
+        else:
+            load = type_file_loader(type_files, registry)
+            for type_file in type_files:
+                load(type_file)
+        return registry
+
+    @classmethod
+    def dump_snapshot(cls, path=SNAPSHOT_FILE, type_files=None):
+        """
+        Parses the type files (all of mime/types by default) and writes them
+        to a snapshot that startup() loads instead of the text files for as
+        long as it is newer than all of them.
+        """
+        if type_files is None:
+            type_files = default_type_files()
+        sections = dict((basename(type_file),
+                         [mime_type.to_row for mime_type in cls.parse_file(type_file)])
+                        for type_file in type_files)
+        snapshot.dump(path, sections)
+
 
-def __parsing_error(filename, index, line, error):
+def _parsing_error(filename, index, line, error):
     print("%s:%s: Parsing error in MIME type definitions." % (filename, index))
     print("=> %s" % line)
     raise error
 
 
-def startup():
+class LazyLoader(object):
+    """
+    Loads type files on demand, installed as Types.loader by startup() in
+    lazy mode. A media type lookup parses only the files named after that
+    media type (e.g. image, image.nonstandard and image.obsolete); media
+    types without a file of their own live in the other.* files. An
+    extension lookup parses only the files that mention the extension.
+    """
+    OTHER = 'other'
+
+    def __init__(self, type_files, registry=Types):
+        self.registry = registry
+        self.pending = list(type_files)
+        # Whatever loads first, types are ordered as if loaded eagerly.
+        registry.rank_sources(self.pending)
+        self.media_types = set(self.media_type_of(f) for f in self.pending)
+        self._extension_files = None
+        self._load = None
+        self._lock = RLock()
+
+    def __call__(self, media_type=None, extension=None):
+        with self._lock:
+            if self._load is None:
+                self._load = type_file_loader(self.pending, self.registry)
+            for type_file in self.files_for(media_type, extension):
+                self.pending.remove(type_file)
+                self._load(type_file)
+            if not self.pending and self.registry.loader is self:
+                self.registry.loader = None
+
+    @staticmethod
+    def media_type_of(type_file):
+        return basename(type_file).split('.')[0]
+
+    def files_for(self, media_type=None, extension=None):
+        if media_type is not None:
+            if media_type not in self.media_types:
+                media_type = self.OTHER
+            return [f for f in self.pending
+                    if self.media_type_of(f) == media_type]
+        if extension is not None:
+            # 'tar.gz' may be registered as is or only as 'gz'.
+            parts = extension.split('.')
+            files = set()
+            for i in range(len(parts)):
+                files.update(self.extension_files.get('.'.join(parts[i:]), ()))
+            return [f for f in self.pending if f in files]
+        return list(self.pending)
+
+    @property
+    def extension_files(self):
+        # A cheap textual scan for the "@ext,ext" column, much faster than
+        # running TEXT_FORMAT_RE over every line.
+        if self._extension_files is None:
+            index = {}
+            for type_file in self.pending:
+                with open(type_file) as fd:
+                    lines = fd.readlines()
+                for line in lines:
+                    pos = line.find(' @')
+                    if pos < 0:
+                        continue
+                    exts = line[pos + 2:].split(None, 1)
+                    for ext in exts and exts[0].split(',') or ():
+                        index.setdefault(ext, set()).add(type_file)
+            self._extension_files = index
+        return self._extension_files
+
+
+class Watcher(object):
+    """
+    Watches type files for changes and reloads those whose modification
+    time or size changed, see MIMETypes.reload. Call poll() periodically,
+    or start() a daemon thread that polls every interval seconds:
+      watcher = Watcher().start()
+    Without type_files it watches every file the registry has loaded.
+    """
+
+    def __init__(self, registry=Types, type_files=None, interval=5.0):
+        self.registry = registry
+        self.type_files = type_files
+        self.interval = interval
+        self._stamps = dict((f, _stamp(f)) for f in self.files())
+        self._stopped = Event()
+        self._thread = None
+
+    def files(self):
+        if self.type_files is not None:
+            return list(self.type_files)
+        return list(self.registry.sources)
+
+    def poll(self):
+        """
+        Reloads the files that changed since the previous poll, each on its
+        own, and returns those reloaded. Files seen for the first time
+        (loaded lazily since) are only recorded. A file that fails to parse
+        keeps its old definitions, with a warning, and is retried once it
+        changes again.
+        """
+        reloaded = []
+        for type_file in self.files():
+            stamp = _stamp(type_file)
+            if type_file not in self._stamps:
+                self._stamps[type_file] = stamp
+            elif self._stamps[type_file] != stamp:
+                try:
+                    MIMETypes.reload([type_file], self.registry)
+                except Exception as e:
+                    warnings.warn('Could not reload %s: %r' % (type_file, e),
+                                  RuntimeWarning)
+                else:
+                    reloaded.append(type_file)
+                self._stamps[type_file] = stamp
+        return reloaded
+
+    def start(self):
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = Thread(target=self._run, name='mime-types-watcher')
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                warnings.warn('Type file watcher failed: %r' % e, RuntimeWarning)
+
+
+def _stamp(type_file):
+    try:
+        stat = os.stat(type_file)
+    except EnvironmentError:
+        return None
+    return (stat.st_mtime, stat.st_size)
+
+
+def default_type_files():
+    return sorted(glob(join(DIR, 'types', '*')))
+
+
+def type_file_loader(type_files, registry=Types):
+    """
+    Returns a callable that registers the types of one type file into
+    registry, reading them from SNAPSHOT_FILE when it is up to date with
+    type_files.
+    """
+    sections = snapshot.load(SNAPSHOT_FILE, type_files)
+    types_dir = join(DIR, 'types')
+
+    def load(type_file):
+        rows = None
+        if sections and dirname(realpath(type_file)) == types_dir:
+            rows = sections.get(basename(type_file))
+        if rows is None:
+            return MIMETypes.load_from_file(type_file, registry)
+        return MIMETypes.load_from_rows(rows, registry, type_file)
+    return load
+
+
+def startup(lazy=None):
     global STARTUP
+    if lazy is None:
+        lazy = LAZY
     if STARTUP:
-        type_files = glob(join(DIR, 'types', '*'))
-        type_files.sort()
-        for type_file in type_files:
-            MIMETypes.load_from_file(type_file)
+        type_files = default_type_files()
+        if lazy:
+            Types.loader = LazyLoader(type_files)
+        else:
+            load = type_file_loader(type_files)
+            for type_file in type_files:
+                load(type_file)
     STARTUP = False
 
 startup()
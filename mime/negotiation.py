@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Server-driven content negotiation (RFC 7231 section 5.3.2) over MIME types.
+  from mime import negotiate
+  negotiate('application/json, text/*;q=0.9, */*;q=0.1',
+            ['application/xml', 'text/html'])
+  # => 'text/html'
+"""
+from .cache import LRUCache
+from .headers import parse_accept
+from .type import Type, UNREG_RE
+
+
+# Compiled Accept headers by header string; browsers send a few thousand
+# distinct ones, see ACCEPT_CACHE.info() for the hit rate.
+ACCEPT_CACHE = LRUCache(4096)
+
+
+def _simplify_range(media_range):
+    (media_type, _, sub_type) = media_range.lower().partition('/')
+    if media_type == '*':
+        return '*'
+    media_type = UNREG_RE.sub('', media_type)
+    if sub_type == '*':
+        return media_type
+    return '%s/%s' % (media_type, UNREG_RE.sub('', sub_type))
+
+
+def compile_accept(accept_header):
+    """
+    Returns the Accept header as ({simplified type: q}, {media type: q},
+    q for */*), keeping the first q given for any range. Media range
+    parameters other than q are ignored.
+    """
+    (exact, partial, anything) = ({}, {}, None)
+    for (media_range, _, q) in parse_accept(accept_header):
+        key = _simplify_range(media_range)
+        if key == '*':
+            if anything is None:
+                anything = q
+        elif '/' in key:
+            exact.setdefault(key, q)
+        else:
+            partial.setdefault(key, q)
+    return (exact, partial, anything)
+
+
+def negotiate(accept_header, available_types):
+    """
+    Returns the item of available_types (Type objects or content type
+    strings, in the server's order of preference) that the Accept header
+    rates highest, or None if it accepts none of them. Each type takes the
+    q of the most specific range matching its simplified name: 'text/html'
+    over 'text/*' over '*/*'. Ties go to the more specific range, then to
+    the earlier item. A missing or empty header accepts anything.
+    """
+    if not accept_header:
+        for available in available_types:
+            return available
+        return None
+    accept = ACCEPT_CACHE.get(accept_header)
+    if accept is None:
+        accept = ACCEPT_CACHE[accept_header] = compile_accept(accept_header)
+    (exact, partial, anything) = accept
+
+    (best, best_rank) = (None, None)
+    for available in available_types:
+        if isinstance(available, Type):
+            simplified = available.simplified
+        else:
+            simplified = Type.simplify(available)
+            if simplified is None:
+                continue
+        q = exact.get(simplified)
+        if q is not None:
+            rank = (q, 2)
+        else:
+            q = partial.get(simplified.partition('/')[0])
+            rank = (q, 1) if q is not None else (anything, 0)
+        if rank[0] and (best_rank is None or rank > best_rank):
+            (best, best_rank) = (available, rank)
+    return best
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+A compact, versioned snapshot of the parsed type files.
+
+Parsing mime/types runs TEXT_FORMAT_RE over every line and builds a Type
+for each match. The snapshot stores the result as marshalled rows (see
+Type.to_row) keyed by type file name, so startup() can skip the parsing
+whenever the snapshot is newer than the files it was built from.
+Build it as part of packaging or deployment:
+
+  python -m mime.snapshot [path]
+"""
+import marshal
+import os
+import sys
+from .version import VERSION
+
+
+MAGIC = 'mime-types-snapshot'
+FORMAT = 1
+
+
+def header():
+    # Any change to the row layout, the data or the marshal format makes an
+    # existing snapshot stale rather than misread.
+    return (MAGIC, FORMAT, VERSION, marshal.version, tuple(sys.version_info[:2]))
+
+
+def dump(path, sections):
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as fd:
+        fd.write(marshal.dumps((header(), sections)))
+    os.rename(tmp, path)
+
+
+def is_fresh(path, type_files):
+    try:
+        mtime = os.path.getmtime(path)
+        return all(os.path.getmtime(f) <= mtime for f in type_files)
+    except EnvironmentError:
+        return False
+
+
+def load(path, type_files=()):
+    """
+    Returns the {type file name: rows} mapping stored at path, or None if
+    the snapshot is missing, unreadable, built by an incompatible version
+    or older than any of type_files.
+    """
+    if not is_fresh(path, type_files):
+        return None
+    try:
+        with open(path, 'rb') as fd:
+            head, sections = marshal.loads(fd.read())
+    except (EnvironmentError, EOFError, ValueError, TypeError):
+        return None
+    if head != header():
+        return None
+    return sections
+
+
+def main(argv=None):
+    from .mime_types import MIMETypes, SNAPSHOT_FILE
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else SNAPSHOT_FILE
+    MIMETypes.dump_snapshot(path)
+    print('Wrote %s' % path)
+
+
+if __name__ == '__main__':
+    main()
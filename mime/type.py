@@ -1,11 +1,22 @@
 # -*- coding: utf-8 -*-
 from future.utils import with_metaclass
 from future.utils import iteritems, itervalues
+import gc
 import re
 import sys
-from collections import defaultdict
-from itertools import chain
-from copy import deepcopy
+import warnings
+from bisect import bisect_left, insort
+from fnmatch import fnmatchcase
+from itertools import chain, islice
+from threading import RLock
+from types import MethodType
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+from .cache import LRUCache
+from .headers import (EMPTY_PARAMS, MEDIA_RANGE_RE, InvalidHeader,
+                      parse_content_type)
 
 
 PLATFORM = sys.platform
@@ -13,6 +24,7 @@ UNREG_RE = re.compile('[Xx]-', re.DOTALL)
 ENCODING_RE = re.compile('(?:base64|7bit|8bit|quoted\-printable)', re.DOTALL)
 PLATFORM_RE = re.compile(sys.platform, re.DOTALL)
 MEDIA_TYPE_RE = re.compile('([-\w.+]+)\/([-\w.+]*)', re.DOTALL)
+PATTERN_TYPE = type(PLATFORM_RE)
 
 SIGNATURES = ('application/pgp-keys',
               'application/pgp',
@@ -22,12 +34,40 @@ SIGNATURES = ('application/pgp-keys',
               'application/pkcs7-signature',
               'text/vcard')
 
+# Results of Type.simplify for the content type strings looked up most
+# recently; see SIMPLIFY_CACHE.info() for its hit rate.
+SIMPLIFY_CACHE = LRUCache(1024)
+
+# Bits of Type#flags, computed when a Type is built and kept up to date by
+# the setters of the attributes they derive from.
+FLAG_REGISTERED = 0x01  # is_registered
+FLAG_OBSOLETE = 0x02    # is_obsolete
+FLAG_BINARY = 0x04      # is_binary (not is_ascii)
+FLAG_SIGNATURE = 0x08   # is_signature
+FLAG_SYSTEM = 0x10      # is_system
+FLAG_PLATFORM = 0x20    # is_platform
+FLAG_COMPLETE = 0x40    # is_complete
+FLAG_MASK = 0x7f
+_FLAG_DECLARED = 0x80   # registered as declared, even with an x- name
+_FLAG_X_NAME = 0x100    # x- media or sub type
+_MISSING = object()
+# The source rank of types registered without a source, see TypeIndex.
+UNRANKED = sys.maxsize
+
 RFC_URL = "http://rfc-editor.org/rfc/rfc%s.txt"
 IANA_URL = "http://www.iana.org/assignments/media-types/%s/%s"
 LTSW_URL = "http://www.ltsw.se/knbase/internet/%s.htp"
 DRAFT_URL = "http://datatracker.ietf.org/public/idindex.cgi?command=id_details&filename=%s"
 CONTACT_URL = "http://www.iana.org/assignments/contact-people.htm#%s"
 REGEX_URLS = {'^RFC(\d+)$': RFC_URL, '^DRAFT:(.+)$': DRAFT_URL, '^\[([^\]]+)\]': CONTACT_URL}
+URL_PATTERNS = tuple((re.compile(regex), url) for (regex, url) in REGEX_URLS.items())
+NAMED_URL_RE = re.compile('^\{([^=]+)=([^\}]+)\}')
+NAMED_CONTACT_RE = re.compile('^\[([^=]+)=([^\]]+)\]')
+
+try:
+    intern = sys.intern
+except AttributeError:
+    pass  # Python 2 builtin
 
 if sys.version_info[0] == 3:
     basestring = str
@@ -36,6 +76,67 @@ if sys.version_info[0] == 3:
         if isinstance(y, Type): return y.__cmp__(x) * -1
         return 0 if x == y else (1 if x > y else -1)
 
+def _simplify(content_type):
+    matchdata = MEDIA_TYPE_RE.match(content_type)
+    if matchdata is None:
+        return None
+    (media_type, subtype) = matchdata.groups()
+    return '%s/%s' % (UNREG_RE.sub('', media_type.lower()),
+                      UNREG_RE.sub('', subtype.lower()))
+
+
+def _suffix(filename, depth):
+    """
+    Returns the part of filename after the depth-th last dot of its base
+    name, or after the first dot if there are fewer, e.g. 'tar.gz' for
+    ('dir.d/a.tar.gz', 2). Leading dots of the base name do not start an
+    extension. A bare name without dots or separators is taken as an
+    extension itself, so type_for('gif') keeps working.
+    """
+    if depth == 1:
+        # Fast path for the usual 'dir/name.ext'.
+        (head, _, ext) = filename.rpartition('.')
+        if (head and head[-1] not in './\\' and
+                '/' not in ext and '\\' not in ext):
+            return ext
+    start = max(filename.rfind('/'), filename.rfind('\\')) + 1
+    if start == 0 and '.' not in filename:
+        return filename
+    while filename.startswith('.', start):
+        start += 1
+    (pos, found) = (len(filename), -1)
+    for _ in range(depth):
+        pos = filename.rfind('.', start, pos)
+        if pos < 0:
+            break
+        found = pos
+    return None if found < 0 else filename[found + 1:]
+
+
+def _is_literal(pattern):
+    return not ('*' in pattern or '?' in pattern or '[' in pattern)
+
+
+def _intern(s):
+    # intern() only accepts exact str instances.
+    return intern(s) if type(s) is str else s
+
+
+def _is_unregistered_name(mime_type):
+    return bool(UNREG_RE.match(mime_type.raw_media_type) or
+                UNREG_RE.match(mime_type.raw_sub_type))
+
+
+def _from_row(cls, row):
+    # Unpickles a Type, see Type#__reduce__.
+    return cls.from_row(row)
+
+
+def _from_frozen_row(row):
+    # Unpickles a FrozenType, see FrozenType#__reduce__.
+    return Type.from_row(row).freeze()
+
+
 def flatten(l):
     if isinstance(l, (list, tuple)):
         return [e for i in l for e in flatten(i)]
@@ -53,6 +154,13 @@ class Type(object):
     object is yielded to an optional block for additional configuration,
     such as associating extensions and encoding information.
     """
+    # The registry keeps every Type resident, so instances carry no
+    # __dict__ and share interned strings for their names and extensions.
+    __slots__ = ('content_type', 'raw_media_type', 'raw_sub_type',
+                 'simplified', 'media_type', 'sub_type', '_extensions',
+                 '_encoding', '_system', '_url', '_urls',
+                 '_docs', '_use_instead', 'sort_key', '_flags')
+
     def __init__(self, content_type):
         if content_type is None:
             raise InvalidContentType('Invalid Content-Type provided "(%s)"' % content_type)
@@ -65,7 +173,12 @@ class Type(object):
         #   Returns the whole MIME content-type string.
         #   text/plain        => text/plain
         #   x-chemical/x-pdb  => x-chemical/x-pdb
-        self.content_type = content_type
+        self.content_type = _intern(content_type)
+
+        # sort_key
+        #   The lowercase content type, which orders, compares and hashes
+        #   MIME::Types: sorted(types, key=attrgetter('sort_key')).
+        self.sort_key = self.content_type.lower()
 
         # raw_media_type
         #   Returns the media type of the unmodified MIME type.
@@ -76,7 +189,7 @@ class Type(object):
         #   Returns the media type of the unmodified MIME type.
         #   text/plain        => plain
         #   x-chemical/x-pdb  => x-pdb
-        (self.raw_media_type, self.raw_sub_type) = matchdata.group(1, 2)
+        (self.raw_media_type, self.raw_sub_type) = map(_intern, matchdata.group(1, 2))
 
         # simplified
         #   The MIME types main- and sub-label can both start with <tt>x-</tt>,
@@ -86,7 +199,9 @@ class Type(object):
         #   removed and are translated to lowercase.
         #   text/plain        => text/plain
         #   x-chemical/x-pdb  => chemical/pdb
-        self.simplified = self.simplify(self.content_type)
+        #   Computed without SIMPLIFY_CACHE so that loading the registry does
+        #   not flush the lookups that are actually hot.
+        self.simplified = _intern(_simplify(self.content_type))
 
         # media_type
         #   Returns the media type of the simplified MIME type.
@@ -97,7 +212,8 @@ class Type(object):
         #   Returns the sub-type of the simplified MIME type.
         #   text/plain        => plain
         #   x-chemical/x-pdb  => pdb
-        (self.media_type, self.sub_type) = MEDIA_TYPE_RE.match(self.simplified).group(1, 2)
+        (self.media_type, self.sub_type) = map(
+            _intern, MEDIA_TYPE_RE.match(self.simplified).group(1, 2))
 
         # The list of extensions which are known to be used for this MIME::Type.
         # Non-array values will be coerced into an array with #to_a. Array
@@ -105,10 +221,12 @@ class Type(object):
         self._extensions = []
         self._encoding = 'default'
         self._system = None
+        self._init_flags()
         self.registered = True
 
         # The encoded URL list for this MIME::Type. See #urls for more information.
-        self.url = None
+        self._url = None
+        self._urls = None
         self.is_obsolete = False
         self._docs = ''
         self._use_instead = None
@@ -126,35 +244,54 @@ class Type(object):
         something that can be treated as a String). In comparisons,
         this is done against the lowercase version of the MIME::Type.
         """
-        if hasattr(other, 'content_type'):
-            return cmp(self.content_type.lower(), other.content_type.lower())
+        (key, other_key) = self._keys(other)
+        return cmp(key, other_key)
+
+    def _keys(self, other):
+        # The keys __cmp__ and the rich comparisons compare.
+        if isinstance(other, Type):
+            return (self.sort_key, other.sort_key)
+        elif hasattr(other, 'content_type'):
+            return (self.sort_key, other.content_type.lower())
         elif isinstance(other, basestring):
-            return cmp(self.simplified, self.simplify(str(other)))
+            return (self.simplified, self.simplify(str(other)))
         else:
-            return cmp(self.content_type.lower(), other.lower())
+            return (self.sort_key, other.lower())
 
     def __lt__(self, other):
-        if hasattr(other, 'content_type'):
-            return cmp(self.content_type.lower(), other.content_type.lower()) < 0
-        elif isinstance(other, basestring):
-            return cmp(self.simplified, self.simplify(str(other))) < 0
-        else:
-            return cmp(self.content_type.lower(), other.lower()) < 0
+        (key, other_key) = self._keys(other)
+        return key < other_key
+
+    def __le__(self, other):
+        (key, other_key) = self._keys(other)
+        return key <= other_key
 
     def __gt__(self, other):
-        if hasattr(other, 'content_type'):
-            return cmp(self.content_type.lower(), other.content_type.lower()) > 0
-        elif isinstance(other, basestring):
-            return cmp(self.simplified, self.simplify(str(other))) > 0
-        else:
-            return cmp(self.content_type.lower(), other.lower()) > 0
+        (key, other_key) = self._keys(other)
+        return key > other_key
+
+    def __ge__(self, other):
+        (key, other_key) = self._keys(other)
+        return key >= other_key
 
     def __eq__(self, other):
         """
         Returns +true+ if the other object is a MIME::Type and the content
         types match.
         """
-        return isinstance(other, self.__class__) and cmp(self, other) == 0
+        return isinstance(other, Type) and self.sort_key == other.sort_key
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        # Consistent with __eq__: variants of one content type hash alike.
+        return hash(self.sort_key)
+
+    def __reduce__(self):
+        # A class with __slots__ and no __getstate__ cannot be pickled with
+        # protocols 0 and 1 (the default on Python 2): rebuild from to_row.
+        return (_from_row, (self.__class__, self.to_row))
 
     def is_like(self, other):
          # Returns +true+ if the simplified type matches the current
@@ -178,26 +315,28 @@ class Type(object):
         6. Obsolete use-instead definitions are compared.
         """
         pc = cmp(self.simplified, other.simplified)
-        if pc is 0:
-            if self.is_registered != other.is_registered:
+        if pc == 0:
+            flags = self._flags
+            differ = flags ^ other._flags
+            if differ & FLAG_REGISTERED:
                 # registered < unregistered
-                pc = -1 if self.is_registered else 1
-            elif self.platform != other.platform:
+                pc = -1 if flags & FLAG_REGISTERED else 1
+            elif differ & FLAG_SYSTEM:
                 # generic < platform
-                pc = 1 if self.platform else -1
-            elif self.is_complete != other.is_complete:
+                pc = 1 if flags & FLAG_SYSTEM else -1
+            elif differ & FLAG_COMPLETE:
                 # complete < incomplete
-                pc = -1 if self.is_complete else 1
-            elif self.is_obsolete != other.is_obsolete:
+                pc = -1 if flags & FLAG_COMPLETE else 1
+            elif differ & FLAG_OBSOLETE:
                 # current < obsolete
-                pc = 1 if self.is_obsolete else -1
-            if pc is 0 and self.is_obsolete and (self.use_instead != other.use_instead):
+                pc = 1 if flags & FLAG_OBSOLETE else -1
+            if pc == 0 and flags & FLAG_OBSOLETE and (self.use_instead != other.use_instead):
                 if self.use_instead is None:
                     pc = -1
                 elif other.use_instead is None:
                     pc = 1
                 else:
-                    pc = cmp(self.use_instead, other.use_instead)
+                    pc = cmp(list(self.use_instead), list(other.use_instead))
         return pc
 
     @property
@@ -206,7 +345,59 @@ class Type(object):
 
     @extensions.setter
     def extensions(self, value):
-        self._extensions = [] if value is None else flatten(value)
+        self._extensions = [] if value is None else [_intern(ext) for ext in flatten(value)]
+        self._set_flag(FLAG_COMPLETE, self._extensions)
+
+    def _init_flags(self):
+        # The flags that follow from the name, encoding and extensions.
+        flags = 0
+        if _is_unregistered_name(self):
+            flags |= _FLAG_X_NAME
+        if self.simplified in SIGNATURES:
+            flags |= FLAG_SIGNATURE
+        if self.encoding == 'base64':
+            flags |= FLAG_BINARY
+        if self._extensions:
+            flags |= FLAG_COMPLETE
+        self._flags = flags
+
+    def _set_flag(self, flag, value):
+        if value:
+            self._flags |= flag
+        else:
+            self._flags &= ~flag
+
+    @property
+    def flags(self):
+        """
+        The FLAG_* bits that hold for this MIME::Type, maintained by the
+        attribute setters (modifying the extensions list in place does not
+        update FLAG_COMPLETE). Filters can test them all at once:
+          t.flags & (FLAG_REGISTERED | FLAG_OBSOLETE) == FLAG_REGISTERED
+        """
+        return self._flags & FLAG_MASK
+
+    @property
+    def registered(self):
+        # The registration as declared, see #is_registered.
+        return bool(self._flags & _FLAG_DECLARED)
+
+    @registered.setter
+    def registered(self, value):
+        flags = self._flags & ~(_FLAG_DECLARED | FLAG_REGISTERED)
+        if value:
+            flags |= _FLAG_DECLARED
+            if not flags & _FLAG_X_NAME:
+                flags |= FLAG_REGISTERED
+        self._flags = flags
+
+    @property
+    def is_obsolete(self):
+        return bool(self._flags & FLAG_OBSOLETE)
+
+    @is_obsolete.setter
+    def is_obsolete(self, value):
+        self._set_flag(FLAG_OBSOLETE, value)
 
     @property
     def default_encoding(self):
@@ -214,15 +405,14 @@ class Type(object):
 
     @property
     def use_instead(self):
-        if not self.is_obsolete:
+        if not self._flags & FLAG_OBSOLETE:
             return None
         return self._use_instead
 
     @property
     def is_registered(self):
-        if UNREG_RE.match(self.raw_media_type) or UNREG_RE.match(self.raw_sub_type):
-            return False
-        return self.registered
+        # Registered and not named with x-.
+        return bool(self._flags & FLAG_REGISTERED)
 
     @property
     def docs(self):
@@ -233,11 +423,20 @@ class Type(object):
         if d:
             rs = re.compile('use-instead:([-\w.+]+)\/([-\w.+]*)').findall(d)
             if rs:
-                self._use_instead = map(lambda e: "%s/%s" % e, rs)
+                self._use_instead = ["%s/%s" % e for e in rs]
             else:
                 self._use_instead = None
         self._docs = d
 
+    @property
+    def url(self):
+        return self._url
+
+    @url.setter
+    def url(self, value):
+        self._url = None if value is None else list(value)
+        self._urls = None
+
     @property
     def urls(self):
         """
@@ -260,25 +459,41 @@ class Type(object):
         be translated
         into:
           http://www.iana.org/assignments/contact-people.htm#<token>
-        These values will be accessible through #urls, which always returns an array.
+        The special URL values {name=url} and [name=token] are translated
+        into (name, url) pairs.
+        These values will be accessible through #urls, which always returns
+        a tuple. It is decoded once and cached until #url is assigned.
         """
-        def _url(el):
+        urls = self._urls
+        if urls is None:
+            urls = self._urls = self._decode_urls()
+        return urls
+
+    def _decode_urls(self):
+        urls = []
+        for el in self._url or ():
             if el == 'IANA':
-                return IANA_URL % (self.media_type, self.sub_type)
+                urls.append(IANA_URL % (self.media_type, self.sub_type))
+                continue
             elif el == 'LTSW':
-                return LTSW_URL % self.media_type
-            match = re.compile('^\{([^=]+)=([^\}]+)\}').match(el)
+                urls.append(LTSW_URL % self.media_type)
+                continue
+            match = NAMED_URL_RE.match(el)
             if match:
-                return match.group(1, 2)
-            match = re.compile('^\[([^=]+)=([^\]]+)\]').match(el)
+                urls.append(match.group(1, 2))
+                continue
+            match = NAMED_CONTACT_RE.match(el)
             if match:
-                return [match.group(1), CONTACT_URL % match.group(2)]
-            for regex in REGEX_URLS:
-                match = re.compile(regex).match(el)
+                urls.append((match.group(1), CONTACT_URL % match.group(2)))
+                continue
+            for (regex, url) in URL_PATTERNS:
+                match = regex.match(el)
                 if match:
-                    return REGEX_URLS[regex] % match.group(1)
-            return el
-        return map(_url, self.url)
+                    urls.append(url % match.group(1))
+                    break
+            else:
+                urls.append(el)
+        return tuple(urls)
 
     @property
     def encoding(self):
@@ -295,10 +510,11 @@ class Type(object):
         if enc is None or enc == 'default':
             self._encoding = self.default_encoding
         elif ENCODING_RE.match(enc):
-            self._encoding = enc
+            self._encoding = _intern(enc)
         else:
             raise TypeError('The encoding must be None, default, '
                             'base64, 7bit, 8bit, or quoted-printable.')
+        self._set_flag(FLAG_BINARY, self._encoding == 'base64')
 
     @property
     def system(self):
@@ -310,6 +526,9 @@ class Type(object):
             self._system = os
         else:
             self._system = re.compile(os)
+        self._set_flag(FLAG_SYSTEM, self._system is not None)
+        self._set_flag(FLAG_PLATFORM, self._system is not None and
+                       self._system.match(PLATFORM))
 
     @property
     def is_binary(self):
@@ -318,36 +537,36 @@ class Type(object):
         # formats. This method returns +true+ when the MIME type
         # encoding is set
         # to <tt>base64</tt>.
-        return self.encoding == 'base64'
+        return bool(self._flags & FLAG_BINARY)
 
     @property
     def is_ascii(self):
         # Returns +true+ when the simplified MIME type is in the list of known
         # digital signatures.
-        return not self.is_binary
+        return not self._flags & FLAG_BINARY
 
     @property
     def is_signature(self):
         # Returns +true+ when the simplified MIME type is in the list of
         # known digital signatures.
-        return self.simplified.lower() in SIGNATURES
+        return bool(self._flags & FLAG_SIGNATURE)
 
     @property
     def is_system(self):
         # Returns +true+ if the MIME::Type is specific to an operating system.
-        return self.system is not None
+        return bool(self._flags & FLAG_SYSTEM)
 
     @property
     def is_platform(self):
         # Returns +true+ if the MIME::Type is specific to the current operating
         # system as represented by RUBY_PLATFORM.
-        return self.is_system and self.system.match(PLATFORM)
+        return bool(self._flags & FLAG_PLATFORM)
 
     @property
     def is_complete(self):
         # Returns +true+ if the MIME::Type specifies an extension list,
         # indicating that it is a complete MIME::Type.
-        return bool(self.extensions)
+        return bool(self._flags & FLAG_COMPLETE)
 
     @property
     def to_s(self):
@@ -379,6 +598,42 @@ class Type(object):
                 'URL': self.url,
                 'Registered': self.is_registered}
 
+    @property
+    def definition(self):
+        # Everything that tells this MIME type apart from its other variants;
+        # a Types registry keeps one Type per definition.
+        return (self.content_type, tuple(self.extensions), self.encoding,
+                self.system and self.system.pattern, self.is_obsolete,
+                self.docs or '', tuple(self.url or ()), self.is_registered)
+
+    @property
+    def to_row(self):
+        # Returns the parsed state of the MIME type as a tuple of plain
+        # values suitable for marshalling, see Type.from_row.
+        return (self.content_type, self.raw_media_type, self.raw_sub_type,
+                self.simplified, self.media_type, self.sub_type,
+                self._extensions, self._encoding,
+                self._system and self._system.pattern, self.registered,
+                self.url, self.is_obsolete, self._docs, self._use_instead)
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        Rebuilds a MIME::Type from Type#to_row without re-parsing the
+        content type, extensions or documentation.
+        """
+        mt = cls.__new__(cls)
+        (mt.content_type, mt.raw_media_type, mt.raw_sub_type,
+         mt.simplified, mt.media_type, mt.sub_type,
+         mt._extensions, mt._encoding, system, registered,
+         mt.url, is_obsolete, mt._docs, mt._use_instead) = row
+        mt._init_flags()
+        mt.system = system
+        mt.registered = registered
+        mt.is_obsolete = is_obsolete
+        mt.sort_key = mt.content_type.lower()
+        return mt
+
     @classmethod
     def simplify(cls, content_type):
         """
@@ -387,13 +642,12 @@ class Type(object):
         registration this flag can disappear, adds to the confusing
         proliferation of MIME types. The simplified string has the
         <tt>x-</tt> removed and are translated to lowercase.
+        Results are memoized in SIMPLIFY_CACHE.
         """
-        matchdata = MEDIA_TYPE_RE.match(content_type)
-        if matchdata is None:
-            return None
-        wrap = lambda s: re.sub(UNREG_RE, '', s.lower())
-        (media_type, subtype) = matchdata.groups()
-        return '%s/%s' % (wrap(media_type), wrap(subtype))
+        simplified = SIMPLIFY_CACHE.get(content_type, _MISSING)
+        if simplified is _MISSING:
+            simplified = SIMPLIFY_CACHE[content_type] = _simplify(content_type)
+        return simplified
 
     @classmethod
     def from_array(cls, content_type,
@@ -464,26 +718,526 @@ class Type(object):
           t.system      = plaintext.system.dup
           t.encoding = plaintext.encoding.dup
         """
-        mt = cls(deepcopy(mime_type.content_type))
-        mt.extensions = map(deepcopy, mime_type.extensions)
-        mt.url = mime_type.url and map(deepcopy, mime_type.url) or None
-        mt.system = deepcopy(mime_type.system)
-        mt.encoding = deepcopy(mime_type.encoding)
-        mt.docs = deepcopy(mime_type.docs)
+        # The strings are immutable, and compiled patterns cannot be
+        # deep-copied before Python 3.7: the system is compiled again.
+        mt = cls(mime_type.content_type)
+        mt.extensions = list(mime_type.extensions)
+        mt.url = mime_type.url and list(mime_type.url) or None
+        mt.system = mime_type.system and mime_type.system.pattern
+        mt.encoding = mime_type.encoding
+        mt.docs = mime_type.docs
 
         mt.is_obsolete = mime_type.is_obsolete
         mt.registered = mime_type.is_registered
         return mt
 
+    @property
+    def is_frozen(self):
+        return False
 
-class ItemMeta(type):
-    def __getitem__(cls, type_id):
-        if isinstance(type_id, Type):
-            return cls.type_variants.get(type_id.simplified)
-        elif isinstance(type_id, re._pattern_type):
-            return cls.match(type_id)
+    def freeze(self):
+        """
+        Makes this MIME::Type immutable in place and returns it: its
+        extensions and URLs become tuples and setting any attribute raises
+        AttributeError. Type.from_mime_type returns a mutable copy.
+        """
+        self._extensions = tuple(self._extensions)
+        if self._url is not None:
+            self._url = tuple(self._url)
+        self._urls = self._decode_urls()
+        if self._use_instead is not None:
+            self._use_instead = tuple(self._use_instead)
+        self.__class__ = FrozenType
+        return self
+
+
+class FrozenType(Type):
+    """
+    A MIME::Type after Type#freeze. It has the same slots as Type, so
+    freezing swaps the class of an existing object instead of copying it.
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%r is frozen, cannot set %s' % (self, name))
+
+    def __delattr__(self, name):
+        raise AttributeError('%r is frozen, cannot delete %s' % (self, name))
+
+    def __reduce__(self):
+        # Unpickling sets the slots one by one, which a FrozenType refuses:
+        # rebuild a Type and freeze it instead.
+        return (_from_frozen_row, (self.to_row,))
+
+    @property
+    def is_frozen(self):
+        return True
+
+    def freeze(self):
+        return self
+
+
+class TypeIndex(object):
+    """
+    The lookup tables of a registry: the variants of every simplified type,
+    the types of every extension, and the sorted type names, overall and by
+    facet (media type, structured syntax suffix such as 'xml' for '+xml',
+    and registration tree: 'vnd.', 'prs.', 'x.', or 'x-' for unregistered
+    names).
+    sources maps each source given to replace_source (a type file) to the
+    types it registered, so that they can be replaced as a whole.
+    Variants of equal priority and the types of an extension are kept in
+    the order of their sources (ranked when first seen, see #rank_source)
+    and of their position in them, then of addition for types added
+    without a source. Loading the same sources lazily, eagerly or again
+    therefore always gives the same order.
+    count is the number of registered types, kept up to date by add and
+    remove, and types lists each of them once (see #types).
+    A published index is never modified. Writers change a copy() and
+    publish it whole, so readers holding an index see a consistent state
+    without locking. A copy shares every list with its original until the
+    first write to it, but copies the tables themselves: every published
+    change costs time in proportion to the number of types, however small.
+    """
+    __slots__ = ('type_variants', 'extension_index', 'sorted_types',
+                 'media_type_index', 'suffix_index', 'tree_index',
+                 'suffix_depth', 'sources', 'source_ranks', 'count',
+                 '_order', '_serial', '_types', '_owned')
+
+    TREES = ('vnd.', 'prs.', 'x.')
+
+    def __init__(self):
+        self.type_variants = {}
+        self.extension_index = {}
+        self.sorted_types = []
+        self.media_type_index = {}
+        self.suffix_index = {}
+        self.tree_index = {}
+        # The most dot-separated parts in any extension (2 once something
+        # registers 'tar.gz'), i.e. how far type_for looks back.
+        self.suffix_depth = 1
+        self.sources = {}
+        self.source_ranks = {}
+        self.count = 0
+        # The (source rank, position) of every type by id(), see #_key.
+        self._order = {}
+        self._serial = 0
+        self._types = None
+        self._owned = set()
+
+    def copy(self):
+        index = TypeIndex.__new__(TypeIndex)
+        index.type_variants = dict(self.type_variants)
+        index.extension_index = dict(self.extension_index)
+        index.sorted_types = list(self.sorted_types)
+        index.media_type_index = dict(self.media_type_index)
+        index.suffix_index = dict(self.suffix_index)
+        index.tree_index = dict(self.tree_index)
+        index.suffix_depth = self.suffix_depth
+        index.sources = dict(self.sources)
+        index.source_ranks = dict(self.source_ranks)
+        index.count = self.count
+        index._order = dict(self._order)
+        index._serial = self._serial
+        index._types = self._types
+        index._owned = set()
+        return index
+
+    def freeze(self):
+        """
+        Returns a copy of this index whose tables hold tuples instead of
+        lists, after freezing every Type in it (see Type#freeze). A frozen
+        index can still be copied and added to.
+        """
+        index = self.copy()
+        for table in (index.type_variants, index.extension_index,
+                      index.media_type_index, index.suffix_index,
+                      index.tree_index):
+            for key, items in iteritems(table):
+                table[key] = tuple(items)
+        for variants in itervalues(index.type_variants):
+            for mime_type in variants:
+                mime_type.freeze()
+        index.sorted_types = tuple(index.sorted_types)
+        return index
+
+    @property
+    def is_frozen(self):
+        return isinstance(self.sorted_types, tuple)
+
+    @property
+    def types(self):
+        """
+        Every registered type exactly once, as a tuple ordered by type name
+        and then by priority, the best variant first. Built on first use
+        after a change.
+        """
+        types = self._types
+        if types is None:
+            variants = self.type_variants
+            types = self._types = tuple(chain.from_iterable(
+                variants[key] for key in self.sorted_types))
+        return types
+
+    def _writable(self, table, key):
+        # The list stored under key, copied first unless this index created it.
+        items = table.get(key)
+        if items is None:
+            items = table[key] = []
+        elif (id(table), key) not in self._owned:
+            items = table[key] = list(items)
+        self._owned.add((id(table), key))
+        return items
+
+    def _discard(self, table, key, item):
+        # Removes item itself (not an equal object) from the list under key,
+        # dropping the key with the last item. Returns False if it is absent.
+        items = table.get(key, ())
+        for (pos, other) in enumerate(items):
+            if other is item:
+                break
+        else:
+            return False
+        if len(items) == 1:
+            del table[key]
         else:
-            return cls.type_variants.get(Type.simplify(type_id))
+            del self._writable(table, key)[pos]
+        return True
+
+    def _discard_name(self, table, key, name):
+        # Same for the sorted type names of the facet indexes.
+        items = table.get(key, ())
+        pos = bisect_left(items, name)
+        if pos == len(items) or items[pos] != name:
+            return
+        if len(items) == 1:
+            del table[key]
+        else:
+            del self._writable(table, key)[pos]
+
+    def rank_source(self, source):
+        # The rank of source, the next one if it is new.
+        rank = self.source_ranks.get(source)
+        if rank is None:
+            rank = self.source_ranks[source] = len(self.source_ranks)
+        return rank
+
+    def _key(self, mime_type, key=None):
+        # The ordering key of mime_type, recording key (or, for a type
+        # without a source, the next one after every source) if it has none.
+        order = self._order
+        current = order.get(id(mime_type))
+        if current is None:
+            if key is None:
+                self._serial += 1
+                key = (UNRANKED, self._serial)
+            current = order[id(mime_type)] = key
+        return current
+
+    def add_type_variant(self, mime_type):
+        """
+        Inserts mime_type into the variants of its simplified type, keeping
+        them ordered by Type#priority_compare (equal variants by source, see
+        above), so the best variant is always first. The order is not
+        revisited if a registered Type is modified later.
+        """
+        simplified = mime_type.simplified
+        variants = self._writable(self.type_variants, simplified)
+        key = self._key(mime_type)
+        order = self._order
+        (lo, hi) = (0, len(variants))
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cmp = mime_type.priority_compare(variants[mid])
+            if cmp < 0 or cmp == 0 and key < order[id(variants[mid])]:
+                hi = mid
+            else:
+                lo = mid + 1
+        variants.insert(lo, mime_type)
+        self.count += 1
+        self._types = None
+
+        trees = []
+        if len(variants) == 1:
+            insort(self.sorted_types, simplified)
+            insort(self._writable(self.media_type_index, mime_type.media_type),
+                   simplified)
+            (_, plus, suffix) = mime_type.sub_type.rpartition('+')
+            if plus and suffix:
+                insort(self._writable(self.suffix_index, suffix), simplified)
+            trees = [t for t in self.TREES if mime_type.sub_type.startswith(t)]
+        if _is_unregistered_name(mime_type):
+            trees.append('x-')
+        for tree in trees:
+            keys = self.tree_index.get(tree, ())
+            pos = bisect_left(keys, simplified)
+            if pos == len(keys) or keys[pos] != simplified:
+                self._writable(self.tree_index, tree).insert(pos, simplified)
+
+    def index_extensions(self, mime_type):
+        key = self._key(mime_type)
+        order = self._order
+        for ext in mime_type.extensions:
+            types = self._writable(self.extension_index, ext)
+            pos = len(types)
+            while pos and order[id(types[pos - 1])] > key:
+                pos -= 1
+            types.insert(pos, mime_type)
+            depth = ext.count('.') + 1
+            if depth > self.suffix_depth:
+                self.suffix_depth = depth
+
+    def add(self, mime_type, key=None):
+        """
+        Registers mime_type unless a Type with the same definition is
+        already registered, which is returned instead; returns None
+        otherwise. key is its (source rank, position), see replace_source.
+        """
+        registered = self.find(mime_type)
+        if registered is None:
+            self._key(mime_type, key)
+            self.add_type_variant(mime_type)
+            self.index_extensions(mime_type)
+        return registered
+
+    def find(self, mime_type):
+        # The registered variant that is or duplicates mime_type, if any.
+        variants = self.type_variants.get(mime_type.simplified)
+        if not variants:
+            return None
+        for registered in variants:
+            if registered is mime_type:
+                return registered
+        definition = mime_type.definition
+        for registered in variants:
+            if registered.definition == definition:
+                return registered
+        return None
+
+    def remove(self, mime_type):
+        """
+        Removes mime_type, the registered object itself, from every table
+        in time proportional to its extensions and variants. Returns False
+        if it is not registered.
+        """
+        simplified = mime_type.simplified
+        if not self._discard(self.type_variants, simplified, mime_type):
+            return False
+        self.count -= 1
+        self._types = None
+        self._order.pop(id(mime_type), None)
+        for ext in mime_type.extensions:
+            self._discard(self.extension_index, ext, mime_type)
+        variants = self.type_variants.get(simplified)
+        if not variants:
+            del self.sorted_types[bisect_left(self.sorted_types, simplified)]
+            self._discard_name(self.media_type_index, mime_type.media_type,
+                               simplified)
+            (_, plus, suffix) = mime_type.sub_type.rpartition('+')
+            if plus and suffix:
+                self._discard_name(self.suffix_index, suffix, simplified)
+            for tree in self.TREES + ('x-',):
+                self._discard_name(self.tree_index, tree, simplified)
+        elif not any(_is_unregistered_name(t) for t in variants):
+            self._discard_name(self.tree_index, 'x-', simplified)
+        return True
+
+    def replace_source(self, source, mime_types):
+        # Swaps the types registered for source for those of mime_types that
+        # are not duplicates, in the place of the old ones.
+        rank = self.rank_source(source)
+        for mime_type in self.sources.get(source, ()):
+            self.remove(mime_type)
+        added = tuple(t for (pos, t) in enumerate(mime_types)
+                      if self.add(t, (rank, pos)) is None)
+        if added:
+            self.sources[source] = added
+        else:
+            self.sources.pop(source, None)
+
+    def extension_types(self, suffix):
+        # The types of the longest registered extension that suffix ends
+        # with, trying 'tar.gz' before 'gz'.
+        while True:
+            type_list = self.extension_index.get(suffix)
+            if type_list:
+                return type_list
+            pos = suffix.find('.')
+            if pos < 0:
+                return ()
+            suffix = suffix[pos + 1:]
+
+    def prefix_keys(self, prefix):
+        keys = self.sorted_types
+        start = bisect_left(keys, prefix)
+        end = start
+        for key in islice(keys, start, None):
+            if not key.startswith(prefix):
+                break
+            end += 1
+        return keys[start:end]
+
+
+class LayeredTable(Mapping):
+    """
+    A read-only mapping over the same table of several indexes, top first.
+    By default a key resolves to the value of the topmost table holding it;
+    with merge=True to the sorted union of the lists of all of them. Found
+    values are cached, misses are not.
+    """
+    def __init__(self, tables, merge=False):
+        self.tables = tuple(tables)
+        self.merge = merge
+        self._cache = {}
+
+    def get(self, key, default=None):
+        value = self._cache.get(key)
+        if value is None:
+            if self.merge:
+                found = [table[key] for table in self.tables if key in table]
+                if len(found) > 1:
+                    value = sorted(set(chain(*found)))
+                elif found:
+                    value = found[0]
+            else:
+                for table in self.tables:
+                    value = table.get(key)
+                    if value:
+                        break
+            if not value:
+                return default
+            self._cache[key] = value
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return any(key in table for table in self.tables)
+
+    def __iter__(self):
+        seen = set()
+        for table in self.tables:
+            for key in table:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class LayeredIndex(TypeIndex):
+    """
+    A read-only TypeIndex over the indexes of stacked registries, top
+    first: a type name or extension defined in a layer hides its variants
+    in the layers below, while the facet indexes list the names of all
+    layers. See Overlay.
+    """
+    __slots__ = ('indexes', '_sorted_types')
+
+    def __init__(self, indexes):
+        self.indexes = tuple(indexes)
+        self.type_variants = LayeredTable(i.type_variants for i in indexes)
+        self.extension_index = LayeredTable(i.extension_index for i in indexes)
+        self.media_type_index = LayeredTable(
+            (i.media_type_index for i in indexes), merge=True)
+        self.suffix_index = LayeredTable(
+            (i.suffix_index for i in indexes), merge=True)
+        self.tree_index = LayeredTable(
+            (i.tree_index for i in indexes), merge=True)
+        self.suffix_depth = max(i.suffix_depth for i in indexes)
+        self.sources = LayeredTable(i.sources for i in indexes)
+        self._types = None
+        self._owned = set()
+        self._sorted_types = None
+
+    def copy(self):
+        """
+        Returns a plain TypeIndex holding what this one resolves to, which
+        is what Types(base=overlay) starts from: the visible variants of
+        every type name and the visible types of every extension. Types
+        keep their order and the sources their rank, top layer first.
+        """
+        index = TypeIndex()
+        keys = {}
+        for source in self.sources:
+            rank = index.rank_source(source)
+            for (pos, mime_type) in enumerate(self.sources[source]):
+                keys.setdefault(id(mime_type), (rank, pos))
+            index.sources[source] = self.sources[source]
+        for mime_type in self.types:
+            index._key(mime_type, keys.get(id(mime_type)))
+            index.add_type_variant(mime_type)
+        for ext in self.extension_index:
+            types = index.extension_index[ext] = list(self.extension_index[ext])
+            for mime_type in types:
+                index._key(mime_type, keys.get(id(mime_type)))
+        index.suffix_depth = self.suffix_depth
+        return index
+
+    @property
+    def sorted_types(self):
+        if self._sorted_types is None:
+            self._sorted_types = sorted(set(
+                chain(*[i.sorted_types for i in self.indexes])))
+        return self._sorted_types
+
+    @property
+    def count(self):
+        # Hidden variants are not counted, so it takes building #types.
+        return len(self.types)
+
+
+def _gc_freeze():
+    if hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+
+
+def _index_property(name):
+    return property(lambda registry: getattr(registry._index, name),
+                    doc='Types._index.%s, see TypeIndex.' % name)
+
+
+def _lookup(registry, type_id):
+    if isinstance(type_id, Type):
+        simplified = type_id.simplified
+    elif isinstance(type_id, PATTERN_TYPE):
+        return registry.match(type_id)
+    else:
+        simplified = Type.simplify(type_id)
+    return registry._variants(simplified)
+
+
+class registrymethod(object):
+    """
+    A classmethod that binds to the instance instead when it is called on
+    one, so that Types.type_for(...) uses the default registry and
+    registry.type_for(...) the registry's own index.
+    """
+    def __init__(self, func):
+        self.__func__ = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, cls):
+        return MethodType(self.__func__, cls if obj is None else obj)
+
+
+class ItemMeta(type):
+    type_variants = _index_property('type_variants')
+    extension_index = _index_property('extension_index')
+    sorted_types = _index_property('sorted_types')
+    media_type_index = _index_property('media_type_index')
+    suffix_index = _index_property('suffix_index')
+    tree_index = _index_property('tree_index')
+    suffix_depth = _index_property('suffix_depth')
+    sources = _index_property('sources')
+
+    __getitem__ = _lookup
 
 
 class Types(with_metaclass(ItemMeta, object)):
@@ -528,86 +1282,542 @@ class Types(with_metaclass(ItemMeta, object)):
     See Also:
         http://www.iana.org/assignments/media-types/
         http://www.ltsw.se/knbase/internet/mime.htp
+    == Registries
+    Called on the class, the methods below use the default registry that
+    mime_types.startup() fills from mime/types. A Types instance is a
+    registry of its own with the same methods:
+     site = Types()
+     site.add(Type.from_array('text/x-site', ['site']))
+     site.type_for('a.site')          # => [<MIME::Type text/x-site>]
+     Types.type_for('a.site')         # => []
+    MIMETypes.load_registry builds one from chosen type files. To give a
+    tenant its own types on top of the default ones, stack the two with
+    Overlay(site, Types), which copies neither.
     """
 
-    type_variants = defaultdict(list)
-    extension_index = defaultdict(list)
+    # The current TypeIndex, replaced as a whole by every change; its
+    # tables are also readable as Types.type_variants, Types.extension_index
+    # and so on. _lock serializes writers only.
+    _index = TypeIndex()
+    _lock = RLock()
+
+    # Optional callable installed by mime_types.startup() in lazy mode. It is
+    # called as loader(media_type=..., extension=...) before a lookup so that
+    # only the type files needed to answer it get parsed; called without
+    # arguments it loads everything that is still pending.
+    loader = None
+
+    # (index, TypeColumns) built by #columns for that version of _index.
+    _columns = None
 
     __metaclass__ = ItemMeta
 
-    def __init__(self, data_version=None):
+    type_variants = _index_property('type_variants')
+    extension_index = _index_property('extension_index')
+    sorted_types = _index_property('sorted_types')
+    media_type_index = _index_property('media_type_index')
+    suffix_index = _index_property('suffix_index')
+    tree_index = _index_property('tree_index')
+    suffix_depth = _index_property('suffix_depth')
+    sources = _index_property('sources')
+
+    __getitem__ = _lookup
+
+    def __init__(self, data_version=None, base=None):
+        """
+        Creates an empty registry, or one holding the types of base (the
+        Types class or another registry, fully loaded first). The index of
+        base is shared until the first change, which copies its tables but
+        neither the Type objects nor their variant lists: about 160 KB per
+        registry for the default types. For per-tenant overrides, an
+        Overlay over base is cheaper, see Overlay.
+        """
         self.data_version = data_version
+        self._lock = RLock()
+        self.loader = None
+        if base is None:
+            self._index = TypeIndex()
+        else:
+            base.load()
+            self._index = base._index
 
     def __repr__(self):
         return '<MIME::Types version:%s>' % self.data_version
 
-    @classmethod
-    def m(cls, type_id, flags={}):
-        return cls.prune_matches(cls[type_id], flags)
+    @registrymethod
+    def m(self, type_id, flags={}):
+        return self.prune_matches(self[type_id], flags)
 
-    @classmethod
-    def match(cls, regex):
-        return flatten([v for k, v in iteritems(cls.type_variants)
-                        if regex.search(k)])
+    @registrymethod
+    def load(self, media_type=None, extension=None):
+        loader = self.loader
+        if loader is not None:
+            loader(media_type=media_type, extension=extension)
 
-    @classmethod
-    def prune_matches(cls, matches, flags):
+    @registrymethod
+    def best(self, type_id):
+        """
+        Returns the preferred variant of a content type (registered, generic,
+        complete and current definitions first), or None if it is unknown.
+          Types.best('text/plain')  # => <MIME::Type text/plain>
+        """
+        if isinstance(type_id, Type):
+            variants = self._variants(type_id.simplified)
+        else:
+            variants = self._variants(Type.simplify(type_id))
+        return variants[0] if variants else None
+
+    @registrymethod
+    def _variants(self, simplified):
+        loader = self.loader
+        if loader is not None and simplified is not None:
+            loader(media_type=simplified.split('/')[0])
+        return self._index.type_variants.get(simplified)
+
+    @registrymethod
+    def match(self, regex):
+        self.load()
+        return [t for k, v in iteritems(self._index.type_variants)
+                if regex.search(k) for t in v]
+
+    @registrymethod
+    def prefix(self, prefix):
+        """
+        Returns the types whose simplified name starts with prefix, using a
+        binary search over Types.sorted_types.
+          Types.prefix('application/vnd.ms-')
+        Prefixes of the unregistered tree ('application/x-') are handled as
+        in Types#glob.
+        """
+        prefix = prefix.lower()
+        if 'x-' in prefix:
+            return self._unregistered(
+                prefix, prefix.partition('/')[0] if '/' in prefix else None,
+                lambda key: key.startswith(prefix))
+        if '/' in prefix:
+            self.load(media_type=prefix.partition('/')[0])
+        else:
+            self.load()
+        index = self._index
+        variants = index.type_variants
+        return [t for key in index.prefix_keys(prefix) for t in variants[key]]
+
+    @registrymethod
+    def glob(self, pattern):
+        """
+        Returns the types whose simplified name matches a shell-style
+        pattern. Candidates come from the narrowest applicable index: the
+        media type ('image/*'), the structured syntax suffix ('*/*+json'),
+        the registration tree ('application/vnd.*') or the literal prefix
+        of the pattern; only those are tested against the pattern.
+        Patterns for the unregistered tree ('application/x-*', 'x-*/*') are
+        matched against the content types of Types.tree_index['x-'] instead,
+        since x- is simplified away. Raises ValueError for patterns with x-
+        anywhere else, which could never match.
+        """
+        pattern = pattern.lower()
+        (media, _, sub) = pattern.partition('/')
+        if 'x-' in pattern:
+            return self._unregistered(pattern, media if _is_literal(media) else None,
+                                      lambda key: fnmatchcase(key, pattern))
+        if _is_literal(media):
+            self.load(media_type=media)
+            index = self._index
+            candidates = index.media_type_index.get(media, ())
+        else:
+            self.load()
+            index = self._index
+            candidates = None
+        facets = []
+        if sub.startswith('*+') and _is_literal(sub[2:]):
+            facets.append(index.suffix_index.get(sub[2:], ()))
+        for tree in index.TREES:
+            if sub.startswith(tree):
+                facets.append(index.tree_index.get(tree, ()))
+        for keys in facets:
+            if candidates is None or len(keys) < len(candidates):
+                candidates = keys
+        if candidates is None:
+            literal = pattern
+            for wildcard in '*?[':
+                literal = literal.partition(wildcard)[0]
+            candidates = index.prefix_keys(literal)
+        variants = index.type_variants
+        return [t for key in candidates if fnmatchcase(key, pattern)
+                for t in variants[key]]
+
+    @registrymethod
+    def _unregistered(self, pattern, media_type, matches):
+        # The types of the x- tree whose lowercased content type (x- is
+        # simplified away) matches, for the glob or prefix pattern.
+        (media, _, sub) = pattern.partition('/')
+        if not (media.startswith('x-') or sub.startswith('x-')):
+            raise ValueError('x- can only start the media or sub type of a '
+                             'pattern: "%s"' % pattern)
+        self.load(media_type=media_type)
+        index = self._index
+        variants = index.type_variants
+        return [t for key in index.tree_index.get('x-', ())
+                for t in variants[key] if matches(t.sort_key)]
+
+    @registrymethod
+    def prune_matches(self, matches, flags):
         if flags.get('complete'):
             matches = filter(lambda e: e.is_complete, matches)
         if flags.get('platform'):
             matches = filter(lambda e: e.is_platform, matches)
         return list(matches)
 
-    @classmethod
-    def add_type_variant(cls, mime_type):
-        cls.type_variants[mime_type.simplified].append(mime_type)
-
-    @classmethod
-    def index_extensions(cls, mime_type):
-        for ext in mime_type.extensions:
-            cls.extension_index[ext].append(mime_type)
-
-    @classmethod
-    def any(cls, block):
-        for mt in flatten(list(itervalues(cls.extension_index))):
-            if block(mt):
-                return True
-
-    @classmethod
-    def all(cls, block):
-        return all([block(mt) for mt in flatten(cls.extension_index.values())])
-
-    @classmethod
-    def defined_types(cls):
-        return chain(*cls.type_variants.values())
-
-    @classmethod
-    def count(cls):
-        return len(list(cls.defined_types()))
+    @registrymethod
+    def freeze(self, gc_freeze=False):
+        """
+        Loads any pending type files, then freezes the registry (see
+        TypeIndex#freeze). Call it in the master of a pre-fork server:
+        workers then look types up without writing to the pages holding
+        them, other than reference counts. Types added later are registered
+        as usual, on a new index, and stay mutable.
+        With gc_freeze, everything the process has allocated so far is also
+        moved out of the collector's reach with gc.freeze() where available
+        (Python 3.7+), which affects the whole process.
+        """
+        self.load()
+        with self._lock:
+            self._index = self._index.freeze()
+        if gc_freeze:
+            _gc_freeze()
+
+    @registrymethod
+    def add_type_variant(self, mime_type):
+        # Registers mime_type by name only, see TypeIndex#add_type_variant.
+        with self._lock:
+            index = self._index.copy()
+            index.add_type_variant(mime_type)
+            self._index = index
+
+    @registrymethod
+    def index_extensions(self, mime_type):
+        with self._lock:
+            index = self._index.copy()
+            index.index_extensions(mime_type)
+            self._index = index
+
+    @registrymethod
+    def any(self, block):
+        return any(block(mt) for mt in self.defined_types())
+
+    @registrymethod
+    def all(self, block):
+        return all(block(mt) for mt in self.defined_types())
+
+    @registrymethod
+    def defined_types(self):
+        """
+        Iterates over every registered type once, by type name and then
+        best variant first (see TypeIndex#types).
+        """
+        self.load()
+        return iter(self._index.types)
 
-    @classmethod
-    def each(cls, block):
-        return map(block, cls.defined_types())
+    @registrymethod
+    def urls(self):
+        """
+        Returns the decoded URLs (see Type#urls) of every registered type
+        that has any, as (Type, urls) pairs sorted by content type.
+        """
+        self.load()
+        return [(mime_type, mime_type.urls)
+                for mime_type in self.defined_types() if mime_type.url]
 
-    @classmethod
-    def type_for(cls, filename, platform=False):
-        ext = filename.split('.')[-1].lower()
-        type_list = cls.extension_index.get(ext, [])
+    @registrymethod
+    def columns(self, content_types=None):
+        """
+        Returns a mime.columns.TypeColumns for filtering many types at once:
+        over every registered type (built once per version of the registry),
+        or with one row per entry of content_types, resolved with #best.
+          Types.columns().select(media_type='image', registered=True,
+                                 obsolete=False, binary=True)
+        """
+        from .columns import TypeColumns
+        if content_types is not None:
+            return TypeColumns([self.best(type_id) for type_id in content_types])
+        self.load()
+        (index, columns) = self._columns or (None, None)
+        if index is not self._index:
+            index = self._index
+            columns = TypeColumns(index.types)
+            self._columns = (index, columns)
+        return columns
+
+    @registrymethod
+    def count(self):
+        self.load()
+        return self._index.count
+
+    @registrymethod
+    def each(self, block):
+        return map(block, self.defined_types())
+
+    @registrymethod
+    def type_for(self, filename, platform=False):
+        """
+        Returns the types registered for the extension of filename, which
+        may be a full path. The longest matching multi-part extension wins,
+        so 'a.tar.gz' resolves on 'tar.gz' if that is registered and on
+        'gz' otherwise; dotfiles such as '.bashrc' have no extension.
+          Types.type_for('/srv/site.d/logo.PNG')  # => [<MIME::Type image/png>]
+        """
+        suffix = _suffix(filename, self._index.suffix_depth)
+        if suffix is None:
+            return []
+        suffix = suffix.lower()
+        loader = self.loader
+        if loader is not None:
+            loader(extension=suffix)
+        type_list = self._index.extension_types(suffix)
         if platform:
             type_list = filter(lambda t: t.is_platform, type_list)
         return list(type_list)
 
     of = type_for
 
-    @classmethod
-    def add(cls, *types):
+    @registrymethod
+    def type_for_many(self, filenames, platform=False):
+        """
+        Classifies an iterable of file names, yielding (filename, types)
+        pairs as they are consumed, where types is the tuple Types.type_for
+        would return as a list. Results are shared between names with the
+        suffix, so large listings pay for each distinct extension only
+        once.
+          for (name, types) in Types.type_for_many(listing):
+              ...
+        """
+        self.load()
+        index = self._index
+        depth = index.suffix_depth
+        seen = {}
+        for filename in filenames:
+            suffix = _suffix(filename, depth)
+            found = seen.get(suffix)
+            if found is None:
+                if len(seen) >= 4096:
+                    seen.clear()
+                type_list = () if suffix is None else index.extension_types(suffix.lower())
+                if platform:
+                    type_list = [t for t in type_list if t.is_platform]
+                found = seen[suffix] = tuple(type_list)
+            yield (filename, found)
+
+    @registrymethod
+    def parse_header(self, header):
+        """
+        Resolves a Content-Type header value against the registry. Returns
+        the best variant of the media type (see Types.best, None if it is
+        unknown) and the header parameters.
+          Types.parse_header('text/html; charset=UTF-8')
+          # => (<MIME::Type text/html>, {'charset': 'UTF-8'})
+        Values without parameters skip the parameter parser and share the
+        read-only EMPTY_PARAMS mapping. Raises InvalidHeader when the value
+        does not follow RFC 2045/7231.
+        """
+        if ';' in header:
+            (content_type, params) = parse_content_type(header)
+        else:
+            match = MEDIA_RANGE_RE.match(header)
+            if match is None or match.end() != len(header):
+                raise InvalidHeader('Invalid media type "%s"' % header)
+            (content_type, params) = (match.group(1), EMPTY_PARAMS)
+        # Valid tokens such as 'text/plain!' can still be no MIME::Type name,
+        # of which Type.simplify would only read the leading part.
+        match = MEDIA_TYPE_RE.match(content_type)
+        if match is None or match.end() != len(content_type):
+            return (None, params)
+        variants = self._variants(Type.simplify(content_type))
+        return (variants[0] if variants else None, params)
+
+    @registrymethod
+    def add(self, *types):
+        """
+        Registers types (Type objects or Types registries) and publishes
+        the result in one step: concurrent lookups see either none or all
+        of them. A Type whose definition (see Type#definition) is already
+        registered is skipped with a warning.
+        """
+        mime_types = []
         for mime_type in types:
             if isinstance(mime_type, Types):
-                cls.add(*mime_type.defined_types())
+                mime_types.extend(mime_type.defined_types())
+            else:
+                mime_types.append(mime_type)
+        with self._lock:
+            index = self._index.copy()
+            for mime_type in mime_types:
+                if index.add(mime_type) is not None:
+                    warnings.warn('Type %s already registered as a variant of %s.'
+                                  % (mime_type, mime_type.simplified),
+                                  stacklevel=2)
+            self._index = index
+
+    @registrymethod
+    def remove(self, *types):
+        """
+        Unregisters types, given as Type objects (removing the registered
+        variant that is or duplicates each) or as content types (removing
+        every variant), and publishes the result in one step. Returns the
+        removed types.
+          Types.remove('application/x-eruby')
+        Removing a type from the index only touches its own entries, but
+        publishing copies the index tables (see TypeIndex#copy) and so
+        costs time in proportion to the size of the registry on every
+        call: remove many types in one call rather than one per call.
+        """
+        with self._lock:
+            index = self._index.copy()
+            removed = self._remove(index, types)
+            self._index = index
+        return removed
+
+    @registrymethod
+    def replace(self, old, new):
+        """
+        Unregisters old (see Types#remove) and registers new in its place
+        in one step, at the cost of one copy of the index. Returns the
+        removed types.
+        """
+        with self._lock:
+            index = self._index.copy()
+            removed = self._remove(index, [old])
+            index.add(new)
+            self._index = index
+        return removed
+
+    @staticmethod
+    def _remove(index, types):
+        removed = []
+        for mime_type in types:
+            if isinstance(mime_type, Type):
+                variants = [index.find(mime_type)]
+            else:
+                variants = list(index.type_variants.get(
+                    Type.simplify(mime_type), ()))
+            for variant in variants:
+                if variant is not None and index.remove(variant):
+                    removed.append(variant)
+        return removed
+
+    @registrymethod
+    def rank_sources(self, sources):
+        """
+        Ranks sources in this order ahead of loading them, so that their
+        types are ordered the same whichever gets loaded first (see
+        TypeIndex). LazyLoader ranks its type files this way.
+        """
+        with self._lock:
+            if all(source in self._index.source_ranks for source in sources):
+                return
+            index = self._index.copy()
+            for source in sources:
+                index.rank_source(source)
+            self._index = index
+
+    @registrymethod
+    def load_sources(self, sources):
+        """
+        Registers the types of each source in sources, a {source: [Type]}
+        mapping where a source is usually the path of a type file, in place
+        of the types that source registered before. The result is
+        published in one step, see MIMETypes.reload.
+        """
+        with self._lock:
+            index = self._index.copy()
+            for (source, mime_types) in iteritems(sources):
+                index.replace_source(source, mime_types)
+            self._index = index
+
+
+class Overlay(Types):
+    """
+    A registry that looks types up in a stack of registries, top first,
+    without copying them:
+      site = Types()
+      site.add(Type.from_array('text/x-site', ['html']))
+      overlay = Overlay(site, Types)
+      overlay.type_for('index.html')  # => [<MIME::Type text/x-site>]
+    A type name or extension defined in a layer hides its definitions in
+    the layers below. Each lookup costs one dictionary probe per layer the
+    first time and one overall after that. The merged results are dropped
+    whenever a layer publishes a new index, i.e. on every change to it.
+    add() registers into the top layer; freeze() freezes every layer.
+    """
+
+    def __init__(self, *layers):
+        self.data_version = None
+        self.layers = layers
+        self._lock = RLock()
+        self._layered = None
+
+    def __repr__(self):
+        return '<MIME::Types overlay of %s>' % ', '.join(
+            repr(layer) for layer in self.layers)
+
+    @property
+    def _index(self):
+        layered = self._layered
+        if layered is not None:
+            for (index, layer) in zip(layered.indexes, self.layers):
+                if index is not layer._index:
+                    break
+            else:
+                return layered
+        layered = self._layered = LayeredIndex(
+            [layer._index for layer in self.layers])
+        return layered
+
+    @property
+    def loader(self):
+        for layer in self.layers:
+            if layer.loader is not None:
+                return self._load_layers
+        return None
+
+    def _load_layers(self, media_type=None, extension=None):
+        for layer in self.layers:
+            layer.load(media_type=media_type, extension=extension)
+
+    def add(self, *types):
+        self.layers[0].add(*types)
+
+    def remove(self, *types):
+        return self.layers[0].remove(*types)
+
+    def replace(self, old, new):
+        return self.layers[0].replace(old, new)
+
+    def load_sources(self, sources):
+        # Each source goes back to the layer that loaded it, new ones to
+        # the top layer.
+        by_layer = [{} for _ in self.layers]
+        for (source, mime_types) in iteritems(sources):
+            for (layer, layer_sources) in zip(self.layers, by_layer):
+                if source in layer.sources:
+                    break
             else:
-                mts = cls.type_variants.get(mime_type.simplified)
-                if mts and mime_type in mts:
-                    Warning('Type %s already registered as a variant of %s.',
-                            mime_type, mime_type.simplified)
-                cls.add_type_variant(mime_type)
-                cls.index_extensions(mime_type)
+                layer_sources = by_layer[0]
+            layer_sources[source] = mime_types
+        for (layer, layer_sources) in zip(self.layers, by_layer):
+            if layer_sources:
+                layer.load_sources(layer_sources)
+
+    def rank_sources(self, sources):
+        self.layers[0].rank_sources(sources)
+
+    def add_type_variant(self, mime_type):
+        self.layers[0].add_type_variant(mime_type)
+
+    def index_extensions(self, mime_type):
+        self.layers[0].index_extensions(mime_type)
+
+    def freeze(self, gc_freeze=False):
+        for layer in self.layers:
+            layer.freeze()
+        if gc_freeze:
+            _gc_freeze()
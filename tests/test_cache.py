@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from unittest import main
+from framework import MIMETestBase
+from mime.cache import LRUCache
+
+
+class TestLRUCache(MIMETestBase):
+
+    def setUp(self):
+        self.cache = LRUCache(2)
+        self.cache['a'] = 1
+        self.cache['b'] = 2
+
+    def test_get(self):
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), None)
+        self.assertEqual(self.cache.get('c', 3), 3)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.get('a')
+        self.cache['c'] = 3
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get('b'), None)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), 3)
+
+    def test_info(self):
+        self.cache.get('a')
+        self.cache.get('z')
+        info = self.cache.info()
+        self.assertEqual((info.hits, info.misses, info.maxsize, info.currsize),
+                         (1, 1, 2, 2))
+        self.cache.clear()
+        self.assertEqual(tuple(self.cache.info()), (0, 0, 2, 0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from unittest import main, skipIf
+from framework import MIMETestBase
+from mime import Type, Types, columns
+from mime.columns import TypeColumns
+
+
+class TestColumns(MIMETestBase):
+
+    def test_select_matches_filter(self):
+        expected = [t for t in Types.columns().types
+                    if t.media_type == 'image' and t.is_registered and
+                    not t.is_obsolete and t.is_binary]
+        self.assertTrue(expected)
+        self.assertEqual(Types.columns().select(media_type='image',
+                                                registered=True,
+                                                obsolete=False, binary=True),
+                         expected)
+
+    def test_columns_cover_registry(self):
+        table = Types.columns()
+        self.assertEqual(len(table), Types.count())
+        self.assertEqual(table.count(), Types.count())
+        self.assertTrue(Types.columns() is table)
+
+    def test_batch(self):
+        table = Types.columns(['image/png', 'text/x-nonexistent',
+                               'application/pdf'])
+        self.assertEqual(table.types[1], None)
+        self.assertEqual(list(table.mask(binary=True)), [True, False, True])
+        self.assertEqual(list(table.mask(binary=False)), [False, False, False])
+        self.assertEqual(list(table.mask()), [True, False, True])
+        self.assertEqual(table.count(encoding='base64'), 2)
+
+    def test_rebuilt_after_add(self):
+        registry = Types(base=Types)
+        table = registry.columns()
+        registry.add(Type('application/x-columns-test'))
+        self.assertFalse(registry.columns() is table)
+        self.assertEqual(registry.columns().count(sub_type='columns-test'), 1)
+        self.assertEqual(Types.columns().count(sub_type='columns-test'), 0)
+
+    def test_unknown_criterion(self):
+        self.assertRaises(TypeError, Types.columns().mask, colour='red')
+
+    def test_pure_python(self):
+        table = TypeColumns([Types.best('image/png'), None], use_numpy=False)
+        self.assertEqual(table.mask(media_type='image'), [True, False])
+        self.assertEqual(table.select(registered=True), [Types.best('image/png')])
+
+    @skipIf(columns.numpy is None, 'NumPy is not installed')
+    def test_numpy(self):
+        types = list(Types.columns().types)
+        python = TypeColumns(types, use_numpy=False)
+        vector = TypeColumns(types, use_numpy=True)
+        criteria = dict(media_type='image', registered=True, obsolete=False)
+        self.assertEqual(list(vector.mask(**criteria)), python.mask(**criteria))
+        self.assertEqual(vector.select(**criteria), python.select(**criteria))
+
+
+if __name__ == '__main__':
+    main()
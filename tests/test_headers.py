@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from unittest import main
+from framework import MIMETestBase
+from mime.headers import (EMPTY_PARAMS, InvalidHeader, parse_accept,
+                          parse_content_type)
+
+
+class TestContentType(MIMETestBase):
+
+    def test_without_parameters(self):
+        self.assertEqual(parse_content_type('text/html'), ('text/html', {}))
+        self.assertEqual(parse_content_type(' text/html '), ('text/html', {}))
+        self.assertTrue(parse_content_type('image/png')[1] is EMPTY_PARAMS)
+
+    def test_parameters(self):
+        self.assertEqual(parse_content_type('text/html; charset=UTF-8'),
+                         ('text/html', {'charset': 'UTF-8'}))
+        self.assertEqual(parse_content_type('Text/HTML;Charset=utf-8;level=1'),
+                         ('Text/HTML', {'charset': 'utf-8', 'level': '1'}))
+        self.assertEqual(parse_content_type('text/html ; charset = utf-8 ;'),
+                         ('text/html', {'charset': 'utf-8'}))
+        self.assertEqual(parse_content_type('text/html;;charset=a;charset=b'),
+                         ('text/html', {'charset': 'a'}))
+
+    def test_quoted_parameters(self):
+        self.assertEqual(
+            parse_content_type('multipart/form-data; boundary="a; b=\\"c\\""'),
+            ('multipart/form-data', {'boundary': 'a; b="c"'}))
+        self.assertEqual(parse_content_type('text/plain; x=""'),
+                         ('text/plain', {'x': ''}))
+
+    def test_invalid(self):
+        for value in ('text', '/html', 'text/html; charset', 'text/html; ="x"',
+                      'text/html; a="unterminated', 'text/html garbage'):
+            self.assertRaises(InvalidHeader, parse_content_type, value)
+
+
+class TestAccept(MIMETestBase):
+
+    def test_parse_accept(self):
+        self.assertEqual(parse_accept('text/html, image/*;q=0.5,*/*; q=0'),
+                         [('text/html', {}, 1.0), ('image/*', {}, 0.5),
+                          ('*/*', {}, 0.0)])
+        self.assertEqual(parse_accept('text/html;level="1,2";q=0.7'),
+                         [('text/html', {'level': '1,2'}, 0.7)])
+
+    def test_parse_accept_skips_invalid(self):
+        self.assertEqual(parse_accept('text, text/plain;q=x, image/png;q=2, ,'
+                                      'text/html'),
+                         [('text/html', {}, 1.0)])
+        self.assertEqual(parse_accept(''), [])
+        self.assertEqual(parse_accept('*/html, */*;q=0.1'), [('*/*', {}, 0.1)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import re
+from os.path import join
+from unittest import main
+from framework import MIMETestBase
+from mime import Types, instrumentation
+from mime.mime_types import DIR, MIMETypes
+from mime.type import ItemMeta
+
+
+class TestInstrumentation(MIMETestBase):
+
+    def setUp(self):
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_disabled_changes_nothing(self):
+        type_for = Types.__dict__['type_for']
+        getitem = ItemMeta.__dict__['__getitem__']
+        instrumentation.enable()
+        self.assertTrue(instrumentation.is_enabled())
+        instrumentation.disable()
+        self.assertTrue(Types.__dict__['type_for'] is type_for)
+        self.assertTrue(ItemMeta.__dict__['__getitem__'] is getitem)
+        Types.type_for('a.png')
+        self.assertEqual(instrumentation.snapshot(),
+                         {'operations': {}, 'files': {}})
+
+    def test_counts_lookups(self):
+        calls = []
+        instrumentation.enable(lambda *args: calls.append(args))
+        Types['text/plain']
+        Types.type_for('a.png')
+        Types.of('a.gif')
+        Types[re.compile('^image/png$')]
+        Types.m('text/plain', {'complete': True})
+        operations = instrumentation.snapshot()['operations']
+        self.assertEqual(operations['getitem']['count'], 3)
+        self.assertEqual(operations['type_for']['count'], 2)
+        self.assertEqual(operations['match']['count'], 1)
+        self.assertEqual(operations['m']['count'], 1)
+        self.assertEqual(sum(operations['type_for']['histogram'].values()), 2)
+        self.assertEqual([(name, detail) for (name, _, detail) in calls[:2]],
+                         [('getitem', 'text/plain'), ('type_for', 'a.png')])
+
+    def test_keyword_arguments(self):
+        calls = []
+        instrumentation.enable(lambda *args: calls.append(args))
+        self.assertEqual(Types.type_for(filename='a.png'), Types.type_for('a.png'))
+        self.assertEqual(Types.match(regex=re.compile('^image/png$')),
+                         Types['image/png'])
+        self.assertEqual(Types.m(type_id='text/plain'), Types['text/plain'])
+        self.assertEqual([(name, detail) for (name, _, detail) in calls[:2]],
+                         [('type_for', 'a.png'), ('type_for', 'a.png')])
+
+    def test_file_stats(self):
+        type_file = join(DIR, 'types', 'text.vms')
+        instrumentation.enable()
+        MIMETypes.load_from_file(type_file, Types())
+        stats = instrumentation.snapshot()['files'][type_file]
+        self.assertEqual((stats['lines'], stats['types']), (1, 1))
+        self.assertTrue(stats['load_time'] >= stats['parse_time'] > 0)
+
+
+if __name__ == '__main__':
+    main()
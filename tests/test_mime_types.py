@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from glob import glob
+from os.path import basename, join
+from unittest import main
+from framework import MIMETestBase
+from mime import Overlay, Type, Types, snapshot
+from mime.mime_types import DIR, LazyLoader, MIMETypes, Watcher
+
+
+class TestLazyLoader(MIMETestBase):
+
+    def setUp(self):
+        self.loader = LazyLoader(sorted(glob(join(DIR, 'types', '*'))))
+
+    def names(self, files):
+        return [basename(f) for f in files]
+
+    def test_files_for_media_type(self):
+        self.assertEqual(self.names(self.loader.files_for('image')),
+                         ['image', 'image.nonstandard', 'image.obsolete'])
+        self.assertEqual(self.names(self.loader.files_for('text')),
+                         ['text', 'text.nonstandard', 'text.obsolete', 'text.vms'])
+        self.assertEqual(self.names(self.loader.files_for('chemical')),
+                         ['other.nonstandard'])
+
+    def test_files_for_extension(self):
+        self.assertEqual(self.names(self.loader.files_for(extension='gif')),
+                         ['image'])
+        self.assertEqual(self.names(self.loader.files_for(extension='doc')),
+                         ['application', 'application.nonstandard',
+                          'application.obsolete', 'text.vms'])
+        self.assertEqual(self.loader.files_for(extension='zzz'), [])
+
+    def test_files_for_everything(self):
+        self.assertEqual(self.loader.files_for(), self.loader.pending)
+
+    def test_lookups_call_loader(self):
+        calls = []
+
+        class Loader(object):
+            # Not a function, which Python 2 would turn into a method.
+            def __call__(self, **kwargs):
+                calls.append(kwargs)
+        Types.loader = Loader()
+        try:
+            Types['image/x-png']
+            Types.type_for('photo.GIF')
+            Types.count()
+        finally:
+            Types.loader = None
+        self.assertEqual(calls, [{'media_type': 'image'},
+                                 {'extension': 'gif'},
+                                 {'media_type': None, 'extension': None}])
+
+
+class TestRegistry(MIMETestBase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.type_file = join(self.tmp_dir, 'image')
+        with open(self.type_file, 'w') as fd:
+            fd.write('image/x-tenant @tnt :base64\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_chosen_files(self):
+        registry = MIMETypes.load_registry([join(DIR, 'types', 'image'),
+                                            self.type_file])
+        self.assertEqual(registry['image/png'], Types['image/png'])
+        self.assertEqual(registry['text/plain'], None)
+        self.assertEqual([str(t) for t in registry.type_for('a.tnt')],
+                         ['image/x-tenant'])
+        self.assertEqual(Types.type_for('a.tnt'), [])
+        self.assertEqual(registry.count(),
+                         len(MIMETypes.parse_file(join(DIR, 'types', 'image'))) + 1)
+
+    def test_lazy_registry(self):
+        registry = MIMETypes.load_registry([self.type_file], lazy=True)
+        self.assertEqual(registry.type_variants, {})
+        self.assertEqual(len(registry['image/tenant']), 1)
+        self.assertTrue(registry.loader is None)
+        self.assertTrue(Types.loader is None)
+
+    def test_lazy_order_matches_eager(self):
+        eager = MIMETypes.load_registry()
+        lazy = MIMETypes.load_registry(lazy=True)
+        lazy['text/plain']
+        lazy['video/mpeg']
+        lazy.type_for('a.js')
+        self.assertEqual(str(lazy.type_for('a.doc')[0]), 'application/msword')
+        lazy.load()
+        for ext in eager.extension_index:
+            self.assertEqual([t.to_row for t in lazy.extension_index[ext]],
+                             [t.to_row for t in eager.extension_index[ext]])
+        for key in eager.type_variants:
+            self.assertEqual([t.to_row for t in lazy.type_variants[key]],
+                             [t.to_row for t in eager.type_variants[key]])
+
+    def test_base_is_shared_until_modified(self):
+        registry = MIMETypes.load_registry([self.type_file], base=Types)
+        self.assertEqual(registry.type_for('a.png'), Types.type_for('a.png'))
+        self.assertEqual(len(registry.type_for('a.tnt')), 1)
+        self.assertEqual(Types.type_for('a.tnt'), [])
+        shared = Types(base=Types)
+        self.assertTrue(shared._index is Types._index)
+        shared.add(Type.from_array('text/x-shared', ['shr']))
+        self.assertFalse(shared._index is Types._index)
+        self.assertTrue(shared.type_variants['text/plain'] is
+                        Types.type_variants['text/plain'])
+        self.assertEqual(Types['text/x-shared'], None)
+
+    def write(self, text, mtime):
+        with open(self.type_file, 'w') as fd:
+            fd.write(text)
+        os.utime(self.type_file, (mtime, mtime))
+
+    def test_reload(self):
+        registry = MIMETypes.load_registry([self.type_file])
+        index = registry._index
+        self.write('image/x-tenant @tnt2\nimage/x-other @oth\n', 1)
+        self.assertEqual(MIMETypes.reload(registry=registry), [self.type_file])
+        self.assertEqual(registry.type_for('a.tnt'), [])
+        self.assertEqual(len(registry.type_for('a.tnt2')), 1)
+        self.assertEqual(len(registry.sources[self.type_file]), 2)
+        self.assertEqual(registry.sorted_types, ['image/other', 'image/tenant'])
+        self.assertEqual(len(index.extension_types('tnt')), 1)
+        os.remove(self.type_file)
+        MIMETypes.reload(registry=registry)
+        self.assertEqual(registry.count(), 0)
+        self.assertEqual(registry.media_type_index, {})
+
+    def test_reload_unchanged_keeps_order(self):
+        registry = MIMETypes.load_registry()
+        names = ('a.doc', 'a.js', 'a.txt', 'a.xml', 'a.bmp')
+        before = [registry.type_for(name) for name in names]
+        variants = list(registry['text/plain'])
+        MIMETypes.reload([join(DIR, 'types', 'application'),
+                          join(DIR, 'types', 'text')], registry)
+        after = [registry.type_for(name) for name in names]
+        self.assertEqual([[t.to_row for t in types] for types in after],
+                         [[t.to_row for t in types] for types in before])
+        self.assertEqual([t.to_row for t in registry['text/plain']],
+                         [t.to_row for t in variants])
+        self.assertEqual(str(registry.type_for('a.doc')[0]), 'application/msword')
+
+    def test_reload_overlay(self):
+        image = join(DIR, 'types', 'image')
+        base = MIMETypes.load_registry([image])
+        site = MIMETypes.load_registry([self.type_file])
+        overlay = Overlay(site, base)
+        count = base.count()
+        self.write('image/x-tenant @tnt2\n', 1)
+        self.assertEqual(sorted(MIMETypes.reload(registry=overlay)),
+                         sorted([image, self.type_file]))
+        self.assertEqual(list(site.sources), [self.type_file])
+        self.assertEqual((site.count(), base.count()), (1, count))
+        self.assertEqual(len(overlay.type_for('a.tnt2')), 1)
+        self.assertEqual(overlay['image/png'], base['image/png'])
+
+    def test_watcher(self):
+        self.write('image/x-tenant @tnt\n', 1)
+        registry = MIMETypes.load_registry([self.type_file])
+        watcher = Watcher(registry)
+        self.assertEqual(watcher.poll(), [])
+        self.write('image/x-tenant @tnt3\n', 2)
+        self.assertEqual(watcher.poll(), [self.type_file])
+        self.assertEqual(len(registry.type_for('a.tnt3')), 1)
+        self.assertEqual(watcher.poll(), [])
+
+    def test_watcher_skips_broken_files(self):
+        import warnings
+        broken = join(self.tmp_dir, 'text')
+        with open(broken, 'w') as fd:
+            fd.write('text/x-tenant @tnt4\n')
+        registry = MIMETypes.load_registry([self.type_file, broken])
+        watcher = Watcher(registry)
+        self.write('image/x-tenant @tnt5\n', 3)
+        with open(broken, 'w') as fd:
+            fd.write('text/x-tenant @tnt6\n!!! not a type\n')
+        os.utime(broken, (3, 3))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.assertEqual(watcher.poll(), [self.type_file])
+        self.assertEqual(len([w for w in caught
+                              if w.category is RuntimeWarning]), 1)
+        self.assertEqual(len(registry.type_for('a.tnt5')), 1)
+        self.assertEqual(len(registry.type_for('a.tnt4')), 1)
+        self.assertEqual(watcher.poll(), [])
+
+
+class TestSnapshot(MIMETestBase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = join(self.tmp_dir, 'types.snapshot')
+        self.type_files = [join(DIR, 'types', 'image'),
+                           join(DIR, 'types', 'text.vms')]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        MIMETypes.dump_snapshot(self.path, self.type_files)
+        sections = snapshot.load(self.path, self.type_files)
+        self.assertEqual(sorted(sections), ['image', 'text.vms'])
+        for type_file in self.type_files:
+            parsed = MIMETypes.parse_file(type_file)
+            loaded = [Type.from_row(row) for row in sections[basename(type_file)]]
+            self.assertEqual([mt.to_a for mt in parsed],
+                             [mt.to_a for mt in loaded])
+            self.assertEqual([mt.simplified for mt in parsed],
+                             [mt.simplified for mt in loaded])
+
+    def test_stale_snapshot_is_ignored(self):
+        MIMETypes.dump_snapshot(self.path, self.type_files)
+        source = join(self.tmp_dir, 'image')
+        shutil.copy(self.type_files[0], source)
+        mtime = os.path.getmtime(self.path) + 10
+        os.utime(source, (mtime, mtime))
+        self.assertEqual(snapshot.load(self.path, [source]), None)
+
+    def test_incompatible_snapshot_is_ignored(self):
+        with open(self.path, 'wb') as fd:
+            fd.write(b'not a snapshot')
+        self.assertEqual(snapshot.load(self.path, self.type_files), None)
+        self.assertEqual(snapshot.load(join(self.tmp_dir, 'missing')), None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from unittest import main
+from framework import MIMETestBase
+from mime import Types, negotiate
+from mime.negotiation import ACCEPT_CACHE, compile_accept
+
+BROWSER = ('text/html,application/xhtml+xml,application/xml;q=0.9,'
+           'image/avif,image/webp,*/*;q=0.8')
+
+
+class TestNegotiate(MIMETestBase):
+
+    def test_exact_and_wildcards(self):
+        self.assertEqual(negotiate(BROWSER, ['application/json', 'text/html']),
+                         'text/html')
+        self.assertEqual(negotiate(BROWSER, ['application/json', 'application/xml']),
+                         'application/xml')
+        self.assertEqual(negotiate(BROWSER, ['application/json']),
+                         'application/json')
+        self.assertEqual(negotiate('image/*;q=0.5, image/png',
+                                   ['image/gif', 'image/png']), 'image/png')
+        self.assertEqual(negotiate('image/*', ['text/plain']), None)
+
+    def test_q_zero_refuses(self):
+        self.assertEqual(negotiate('text/*, text/plain;q=0',
+                                   ['text/plain', 'text/html']), 'text/html')
+        self.assertEqual(negotiate('*/*;q=0', ['text/plain']), None)
+
+    def test_invalid_range_is_ignored(self):
+        self.assertEqual(negotiate('*/html', ['image/png']), None)
+
+    def test_specificity_breaks_ties(self):
+        self.assertEqual(negotiate('*/*, text/html', ['text/plain', 'text/html']),
+                         'text/html')
+        self.assertEqual(negotiate('text/*', ['text/plain', 'text/html']),
+                         'text/plain')
+
+    def test_simplified_matching(self):
+        self.assertEqual(negotiate('application/msword', ['application/x-msword']),
+                         'application/x-msword')
+        word = Types['application/msword'][0]
+        self.assertTrue(negotiate('Application/X-MSWord', [word]) is word)
+
+    def test_missing_header(self):
+        self.assertEqual(negotiate(None, ['text/html', 'text/plain']), 'text/html')
+        self.assertEqual(negotiate('', []), None)
+
+    def test_cache(self):
+        ACCEPT_CACHE.clear()
+        negotiate(BROWSER, ['text/html'])
+        negotiate(BROWSER, ['image/png'])
+        self.assertEqual(ACCEPT_CACHE.info().hits, 1)
+        self.assertEqual(ACCEPT_CACHE.get(BROWSER), compile_accept(BROWSER))
+
+    def test_compile_accept(self):
+        self.assertEqual(compile_accept('text/x-foo;level=1;q=0.3, IMAGE/*, */*;q=0'),
+                         ({'text/foo': 0.3}, {'image': 1.0}, 0.0))
+
+
+if __name__ == '__main__':
+    main()
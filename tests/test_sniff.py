@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import zipfile
+from unittest import main
+from framework import MIMETestBase
+from mime import Types
+from mime.sniff import (MAX_LENGTH, UNDECIDED, Signature, Sniffer, detect,
+                        sniff, sniff_stream)
+
+
+def zip_bytes(*names):
+    buf = io.BytesIO()
+    archive = zipfile.ZipFile(buf, 'w')
+    for name in names:
+        archive.writestr(name, b'<x/>')
+    archive.close()
+    return buf.getvalue()
+
+
+def gzip_bytes():
+    buf = io.BytesIO()
+    archive = gzip.GzipFile(fileobj=buf, mode='wb')
+    archive.write(b'hello')
+    archive.close()
+    return buf.getvalue()
+
+
+class TestSniff(MIMETestBase):
+
+    def assertSniffs(self, data, content_type):
+        self.assertEqual(sniff(data), Types[content_type])
+        self.assertTrue(sniff(data))
+
+    def test_images(self):
+        self.assertSniffs(b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR', 'image/png')
+        self.assertSniffs(b'\xff\xd8\xff\xe0\x00\x10JFIF', 'image/jpeg')
+        self.assertSniffs(b'GIF89a\x01\x00', 'image/gif')
+        self.assertSniffs(b'GIF87a', 'image/gif')
+
+    def test_documents_and_archives(self):
+        self.assertSniffs(b'%PDF-1.7\n', 'application/pdf')
+        self.assertSniffs(gzip_bytes(), 'application/gzip')
+        self.assertSniffs(zip_bytes('a.txt'), 'application/zip')
+        self.assertSniffs(zip_bytes('[Content_Types].xml', 'word/document.xml'),
+                          'application/vnd.openxmlformats-officedocument.'
+                          'wordprocessingml.document')
+        self.assertSniffs(zip_bytes('[Content_Types].xml', 'xl/workbook.xml'),
+                          'application/vnd.openxmlformats-officedocument.'
+                          'spreadsheetml.sheet')
+        self.assertSniffs(zip_bytes('mimetype', 'META-INF/container.xml')
+                          .replace(b'<x/>', b'application/epub+zip', 1),
+                          'application/epub+zip')
+        self.assertSniffs(b'\x7fELF\x02\x01\x01', 'application/x-executable')
+
+    def test_signatures(self):
+        self.assertSniffs(b'-----BEGIN PGP PUBLIC KEY BLOCK-----\n', 'application/pgp-keys')
+        self.assertSniffs(b'-----BEGIN PGP SIGNATURE-----\n', 'application/pgp-signature')
+        self.assertSniffs(b'-----BEGIN PGP MESSAGE-----\n', 'application/pgp')
+        self.assertSniffs(b'-----BEGIN CERTIFICATE REQUEST-----\n', 'application/pkcs10')
+        self.assertSniffs(b'-----BEGIN PKCS7-----\n', 'application/pkcs7-mime')
+        self.assertSniffs(b'\x30\x82\x05\x00\x06\x09\x2a\x86\x48\x86\xf7\x0d\x01\x07\x02',
+                          'application/pkcs7-signature')
+        self.assertSniffs(b'BEGIN:VCARD\r\nVERSION:4.0', 'text/vcard')
+        for mime_type in sniff(b'BEGIN:VCARD'):
+            self.assertTrue(mime_type.is_signature)
+
+    def test_unknown(self):
+        self.assertEqual(sniff(b''), [])
+        self.assertEqual(sniff(b'hello world'), [])
+        self.assertEqual(sniff(b'0123456789'), [])
+
+    def test_buffers(self):
+        data = bytearray(b'%PDF-1.4 and more')
+        self.assertSniffs(data, 'application/pdf')
+        self.assertSniffs(memoryview(data), 'application/pdf')
+        self.assertSniffs(memoryview(b'xx%PDF-')[2:], 'application/pdf')
+
+    def test_file_objects(self):
+        fd = io.BytesIO(b'junk' + b'GIF89a' + b'\x00' * (MAX_LENGTH * 2))
+        fd.seek(4)
+        self.assertSniffs(fd, 'image/gif')
+        self.assertEqual(fd.tell(), 4)
+
+    def test_signature(self):
+        signature = Signature('image/png', b'PNG', offset=1)
+        self.assertTrue(signature.check(b'\x89PNG'))
+        self.assertFalse(signature.check(b'PNG'))
+        self.assertEqual(signature.check(b'\x89P', False), None)
+        self.assertFalse(signature.check(b'\x89X', False))
+        self.assertEqual(signature.length, 4)
+
+    def test_detect_prefix(self):
+        self.assertEqual(detect(b'', False), UNDECIDED)
+        self.assertEqual(detect(b'\x89PN', False), UNDECIDED)
+        self.assertEqual(detect(b'\x89PNG\r\n\x1a\n', False), 'image/png')
+        self.assertEqual(detect(b'hello', False), None)
+        self.assertEqual(detect(zip_bytes('a.txt')[:100], False), UNDECIDED)
+
+
+class TestSniffer(MIMETestBase):
+
+    def feed_bytewise(self, data):
+        sniffer = Sniffer()
+        for (count, byte) in enumerate(data):
+            if sniffer.feed(data[count:count + 1]):
+                return (sniffer, count + 1)
+        sniffer.close()
+        return (sniffer, None)
+
+    def test_decides_early(self):
+        (sniffer, count) = self.feed_bytewise(b'\x89PNG\r\n\x1a\n' + b'\x00' * 100)
+        self.assertEqual((sniffer.content_type, count), ('image/png', 8))
+        self.assertEqual(sniffer.types, Types['image/png'])
+        (sniffer, count) = self.feed_bytewise(b'hello world')
+        self.assertEqual((sniffer.content_type, count), (None, 1))
+        self.assertEqual(sniffer.types, [])
+
+    def test_waits_for_containers(self):
+        docx = zip_bytes('[Content_Types].xml', 'word/document.xml')
+        (sniffer, count) = self.feed_bytewise(docx)
+        self.assertEqual(sniffer.content_type, 'application/vnd.openxmlformats-'
+                                               'officedocument.wordprocessingml.document')
+        self.assertEqual(count, docx.index(b'word/') + len(b'word/'))
+        (sniffer, count) = self.feed_bytewise(zip_bytes('a.txt'))
+        self.assertEqual((sniffer.content_type, count), ('application/zip', None))
+
+    def test_limit(self):
+        sniffer = Sniffer()
+        self.assertFalse(sniffer.feed(b'PK\x03\x04'))
+        self.assertTrue(sniffer.feed(b'\x00' * (MAX_LENGTH * 2)))
+        self.assertEqual(sniffer.content_type, 'application/zip')
+        self.assertTrue(sniffer.feed(b'more'))
+
+    def test_sniff_stream(self):
+        chunks = [b'GIF', b'89a', b'rest', b'of the body']
+        (types, body) = sniff_stream(iter(chunks))
+        self.assertEqual(types, Types['image/gif'])
+        self.assertEqual(list(body), chunks)
+        (types, body) = sniff_stream([b'PK\x03'])
+        self.assertEqual((types, list(body)), ([], [b'PK\x03']))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,8 @@ import re
 from unittest import main
 from framework import MIMETestBase
 from mime import Type
-from mime.type import PLATFORM_RE, InvalidContentType
+from mime.type import PLATFORM_RE, SIMPLIFY_CACHE, InvalidContentType
+from mime import type as mime_type
 
 
 class TestMIMEType(MIMETestBase):
@@ -45,6 +46,15 @@ class TestMIMEType(MIMETestBase):
         self.assertEqual(self.zip_type.simplified, 'appl/zip')
         self.assertEqual(Type.simplify('x-xyz/abc'), 'xyz/abc')
 
+    def test_simplify_cache(self):
+        SIMPLIFY_CACHE.clear()
+        self.assertEqual(Type.simplify('Text/X-Foo'), 'text/foo')
+        self.assertEqual(Type.simplify('Text/X-Foo'), 'text/foo')
+        self.assertEqual(Type.simplify('foo'), None)
+        self.assertEqual(Type.simplify('foo'), None)
+        info = SIMPLIFY_CACHE.info()
+        self.assertEqual((info.hits, info.misses), (2, 2))
+
     def test_CMP(self):
         self.assertEqual(Type('text/plain'), Type('text/plain'))
         self.assertNotEqual(Type('text/plain'), Type('image/jpeg'))
@@ -241,6 +251,89 @@ class TestMIMEType(MIMETestBase):
                                         'Obsolete': False,
                                         'Docs': None})
 
+    def test_compact(self):
+        text = Type('text/plain')
+        self.assertFalse(hasattr(text, '__dict__'))
+        self.assertTrue(text.media_type is Type('text/html').media_type)
+
+    def test_from_row(self):
+        yaml = self.yaml_mime_type_from_array
+        yaml.docs = 'use-instead:text/yaml'
+        copy = Type.from_row(yaml.to_row)
+        self.assertEqual(copy.to_a, yaml.to_a)
+        self.assertEqual(copy.simplified, 'text/yaml')
+        self.assertEqual(copy.to_row, yaml.to_row)
+
+    def test_freeze(self):
+        yaml = self.yaml_mime_type_from_array
+        self.assertFalse(yaml.is_frozen)
+        frozen = yaml.freeze()
+        self.assertTrue(frozen is yaml and yaml.is_frozen)
+        self.assertEqual(yaml.extensions, ('yaml', 'yml'))
+        self.assertEqual(yaml, Type('text/x-yaml'))
+        self.assertEqual(Type('text/x-yaml'), yaml)
+        self.assertRaises(AttributeError, setattr, yaml, 'system', 'vms')
+        self.assertRaises(AttributeError, setattr, yaml, 'is_obsolete', True)
+        copy = Type.from_mime_type(yaml)
+        self.assertEqual(copy.definition, yaml.definition)
+        self.assertEqual(copy.extensions, ['yaml', 'yml'])
+        copy.system = 'vms'
+        copy.url = ['IANA']
+        copy.docs = 'YAML'
+        self.assertFalse(copy.is_frozen)
+        self.assertEqual(Type.from_mime_type(copy.freeze()).definition,
+                         copy.definition)
+
+    def test_pickle(self):
+        import pickle
+        from copy import deepcopy
+        t = Type.from_array('text/x-pickled', ['pkl'], '8bit', 'linux')
+        t.url = ['IANA']
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(t, protocol))
+            self.assertEqual(copy.definition, t.definition)
+            self.assertEqual(copy.to_row, t.to_row)
+        self.assertEqual(deepcopy(t).definition, t.definition)
+        t.freeze()
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(t, protocol))
+            self.assertTrue(copy.is_frozen)
+            self.assertEqual(copy.definition, t.definition)
+        self.assertTrue(deepcopy(t).is_frozen)
+        self.assertRaises(AttributeError, delattr, t, 'content_type')
+
+    def test_hash_and_ordering(self):
+        upper = Type('Text/Plain')
+        lower = Type('text/plain')
+        lower.extensions = ['txt']
+        self.assertEqual(upper, lower)
+        self.assertFalse(upper != lower)
+        self.assertEqual(hash(upper), hash(lower))
+        self.assertEqual(len(set([upper, lower, Type('text/html')])), 2)
+        self.assertTrue(upper <= lower <= upper and upper >= lower)
+        self.assertTrue(Type('text/html') < upper)
+        self.assertTrue(upper > 'text/html' and upper >= 'text/x-plain')
+        self.assertEqual(sorted([upper, Type('image/png'), Type('Audio/X-Wav')]),
+                         [Type('audio/x-wav'), Type('image/png'), lower])
+        self.assertEqual(Type.from_row(upper.to_row).sort_key, 'text/plain')
+
+    def test_flags(self):
+        t = Type.from_array('application/x-flagged', ['flg'], is_registered=True)
+        self.assertEqual(t.flags, mime_type.FLAG_BINARY | mime_type.FLAG_COMPLETE)
+        self.assertTrue(t.registered and not t.is_registered)
+        t = Type.from_array('application/pgp-keys', encoding='7bit',
+                            is_registered=True, system=PLATFORM_RE)
+        self.assertEqual(t.flags, mime_type.FLAG_REGISTERED | mime_type.FLAG_SIGNATURE |
+                         mime_type.FLAG_SYSTEM | mime_type.FLAG_PLATFORM)
+        t.is_obsolete = True
+        t.system = None
+        t.encoding = 'base64'
+        t.extensions = ['asc']
+        t.registered = False
+        self.assertEqual(t.flags, mime_type.FLAG_OBSOLETE | mime_type.FLAG_SIGNATURE |
+                         mime_type.FLAG_BINARY | mime_type.FLAG_COMPLETE)
+        self.assertEqual(Type.from_row(t.to_row).flags, t.flags)
+
     def test_to_s(self):
         self.assertEqual(Type('text/plain').to_s, 'text/plain')
         self.assertEqual(str(Type('text/plain')), 'text/plain')
@@ -267,8 +360,25 @@ class TestMIMEType(MIMETestBase):
     def _test_url_equals(self):
         'Need to write test_url_equals'
 
-    def _test_urls(self):
-        'Need to write test_urls'
+    def test_urls(self):
+        yaml = self.yaml_mime_type_from_array
+        yaml.url = ['IANA', 'RFC2045', 'LTSW', '[Abc]', '{Docs=http://d/}',
+                    '[Abc=Def]', 'DRAFT:x', 'other']
+        urls = yaml.urls
+        self.assertEqual(urls, (
+            'http://www.iana.org/assignments/media-types/text/yaml',
+            'http://rfc-editor.org/rfc/rfc2045.txt',
+            'http://www.ltsw.se/knbase/internet/text.htp',
+            'http://www.iana.org/assignments/contact-people.htm#Abc',
+            ('Docs', 'http://d/'),
+            ('Abc', 'http://www.iana.org/assignments/contact-people.htm#Def'),
+            'http://datatracker.ietf.org/public/idindex.cgi?command=id_details&filename=x',
+            'other'))
+        self.assertTrue(yaml.urls is urls)
+        yaml.url = ['RFC1']
+        self.assertEqual(yaml.urls, ('http://rfc-editor.org/rfc/rfc1.txt',))
+        self.assertEqual(yaml.freeze().urls, ('http://rfc-editor.org/rfc/rfc1.txt',))
+        self.assertEqual(Type('text/plain').urls, ())
 
     def __test_use_instead(self):
         'Need to write test_use_instead'
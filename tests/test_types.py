@@ -2,8 +2,9 @@
 import re
 from unittest import main
 from framework import MIMETestBase
-from mime import Type, Types
+from mime import Overlay, Type, Types
 from mime.type import PLATFORM
+from mime.headers import InvalidHeader
 
 
 class TestMIMETypes(MIMETestBase):
@@ -29,6 +30,52 @@ class TestMIMETypes(MIMETestBase):
         self.assertEqual([Type.from_array('image/x-bmp', ['bmp'])],
                          Types.m(re_type, {'platform': True}))
 
+    def test_class_glob(self):
+        def names(types):
+            return sorted(set(t.simplified for t in types))
+        self.assertEqual(names(Types.glob('image/*')),
+                         names(Types[re.compile('^image/')]))
+        self.assertEqual(names(Types.glob('*/*+json')),
+                         names(Types[re.compile('\\+json$')]))
+        self.assertEqual(names(Types.glob('Application/VND.ms-*')),
+                         names(Types[re.compile('^application/vnd\\.ms-')]))
+        self.assertEqual(names(Types.glob('*/pdf')), ['application/pdf'])
+        self.assertEqual(names(Types.glob('text/?ml')), ['text/xml'])
+        self.assertEqual(Types.glob('nothing/*'), [])
+
+    def test_class_glob_unregistered(self):
+        unregistered = Types.glob('application/x-*')
+        self.assertTrue(unregistered)
+        self.assertEqual(
+            sorted(t.content_type for t in unregistered),
+            sorted(t.content_type for key in Types.tree_index['x-']
+                   for t in Types[key]
+                   if t.content_type.lower().startswith('application/x-')))
+        self.assertEqual([t.content_type for t in Types.glob('Application/X-GZ*')],
+                         ['application/x-gzip'])
+        self.assertEqual([t.content_type for t in Types.glob('application/x-sla')],
+                         ['application/x-SLA'])
+        self.assertRaises(ValueError, Types.glob, 'application/vnd.x-*')
+
+    def test_class_prefix(self):
+        self.assertEqual(sorted(Types.prefix('image/x')),
+                         sorted(Types[re.compile('^image/x')]))
+        self.assertEqual(Types.prefix('text/plain'), Types['text/plain'])
+        self.assertEqual(Types.prefix('zzz'), [])
+        self.assertEqual(sorted(Types.prefix('Application/X-')),
+                         sorted(Types.glob('application/x-*')))
+        self.assertEqual([t.content_type for t in Types.prefix('application/x-gz')],
+                         ['application/x-gzip'])
+        self.assertRaises(ValueError, Types.prefix, 'application/vnd.x-')
+
+    def test_class_facet_indexes(self):
+        self.assertTrue('image/svg+xml' in Types.suffix_index['xml'])
+        self.assertTrue('application/vnd.ms-excel' in Types.tree_index['vnd.'])
+        self.assertTrue('image/prs.btif' in Types.tree_index['prs.'])
+        self.assertTrue('application/gzip' in Types.tree_index['x-'])
+        self.assertTrue('image/png' in Types.media_type_index['image'])
+        self.assertEqual(Types.sorted_types, sorted(Types.type_variants))
+
     def test_class_index_3(self):
         self.assertEqual(Types.m('text/vnd.fly', {'complete': True}), [])
         self.assertNotEqual(Types.m('text/plain', {'complete': True}), [])
@@ -43,8 +90,141 @@ class TestMIMETypes(MIMETestBase):
         Types.add(eruby)
         self.assertEqual(Types['application/x-eruby'], [eruby])
 
-    def _test_class_add_type_variant(self):
-        'Need to write test_class_add_type_variant'
+    def test_class_add_type_variant(self):
+        obsolete = Type.from_array('application/x-prio', ['prio'], is_obsolete=True)
+        incomplete = Type.from_array('application/prio', is_registered=True)
+        unregistered = Type.from_array('application/x-prio', ['prio'])
+        system = Type.from_array('application/prio', ['prio'], system='vms',
+                                 is_registered=True)
+        best = Type.from_array('application/prio', ['prio'], is_registered=True)
+        Types.add(obsolete, incomplete, unregistered, system, best)
+        self.assertEqual([id(t) for t in Types['application/prio']],
+                         [id(t) for t in (best, incomplete, system, unregistered,
+                                          obsolete)])
+        self.assertTrue(Types.best('application/x-prio') is best)
+        self.assertTrue(Types.best(unregistered) is best)
+        self.assertTrue(Types.best('application/x-unknown-prio') is None)
+
+    def test_class_add_concurrent(self):
+        from threading import Thread
+        errors = []
+
+        def writer():
+            for n in range(100):
+                Types.add(Type.from_array('application/x-batch-%d' % n, ['bt%d' % n]),
+                          Type.from_array('text/x-batch-%d' % n, ['bt%d' % n]))
+
+        def reader():
+            for n in range(1000):
+                index = Types._index
+                for ext, types in list(index.extension_index.items()):
+                    if ext.startswith('bt') and len(types) != 2:
+                        errors.append(ext)
+                if 'zz-miss/%d' % n in Types.type_variants:
+                    errors.append(n)
+
+        threads = [Thread(target=writer)] + [Thread(target=reader) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(Types.type_for('x.bt99')), 2)
+        self.assertFalse(any(k.startswith('zz-miss') for k in Types.type_variants))
+
+    def test_index_freeze(self):
+        from mime.type import TypeIndex
+        index = TypeIndex()
+        index.add(Type.from_array('application/x-frozen', ['frz']))
+        index.add(Type.from_array('application/frozen+json', ['frz']))
+        frozen = index.freeze()
+        self.assertTrue(frozen.is_frozen)
+        self.assertFalse(index.is_frozen)
+        self.assertEqual(frozen.sorted_types,
+                         ('application/frozen', 'application/frozen+json'))
+        self.assertEqual(len(frozen.extension_types('frz')), 2)
+        self.assertTrue(isinstance(frozen.suffix_index['json'], tuple))
+        self.assertTrue(all(t.is_frozen for t in frozen.extension_index['frz']))
+        changed = frozen.copy()
+        changed.add(Type.from_array('application/x-frozen', ['frz'], system='vms'))
+        self.assertEqual(len(changed.extension_types('frz')), 3)
+        self.assertEqual(len(frozen.extension_types('frz')), 2)
+
+    def test_index_remove(self):
+        from mime.type import TypeIndex
+        index = TypeIndex()
+        plain = Type.from_array('text/x-removed', ['rmv'])
+        suffixed = Type.from_array('application/vnd.removed+json', ['rmv'])
+        index.add(plain)
+        index.add(suffixed)
+        published = index.freeze()
+        index = published.copy()
+        self.assertTrue(index.remove(suffixed))
+        self.assertFalse(index.remove(suffixed))
+        self.assertFalse(index.remove(Type.from_array('text/x-removed', ['rmv'])))
+        self.assertEqual(index.extension_types('rmv'), [plain])
+        self.assertEqual(index.sorted_types, ['text/removed'])
+        self.assertEqual(index.suffix_index, {})
+        self.assertEqual(list(index.tree_index), ['x-'])
+        self.assertTrue(index.remove(plain))
+        self.assertEqual((index.type_variants, index.extension_index,
+                          index.media_type_index, index.tree_index), ({}, {}, {}, {}))
+        self.assertEqual(len(published.extension_types('rmv')), 2)
+
+    def test_index_count(self):
+        from mime.type import TypeIndex
+        index = TypeIndex()
+        plain = Type.from_array('text/x-counted', ['cnt'])
+        variant = Type.from_array('text/counted', ['cnt', 'cnt2'])
+        bare = Type('text/x-counted-bare')
+        for mime_type in (plain, variant, bare, plain):
+            index.add(mime_type)
+        published = index.freeze()
+        self.assertEqual(published.count, 3)
+        self.assertEqual(published.types, (plain, variant, bare))
+        index = published.copy()
+        index.remove(plain)
+        self.assertEqual((index.count, index.types), (2, (variant, bare)))
+        self.assertEqual((published.count, len(published.types)), (3, 3))
+
+    def test_add_skips_duplicates(self):
+        import warnings
+        registry = Types()
+        rhtml = Type.from_array('application/x-eruby', ['rhtml'], '8bit')
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            registry.add(rhtml, Type.from_array('application/x-eruby', ['rhtml'], '8bit'))
+            registry.add(rhtml)
+        self.assertEqual(len(caught), 2)
+        self.assertEqual(registry['application/x-eruby'], [rhtml])
+        self.assertEqual(registry.type_for('a.rhtml'), [rhtml])
+        variant = Type.from_array('application/x-eruby', ['erb'], '8bit')
+        registry.add(variant)
+        self.assertEqual(len(registry['application/x-eruby']), 2)
+
+    def test_remove_and_replace(self):
+        registry = Types()
+        erb = Type.from_array('application/x-eruby', ['erb', 'rhtml'])
+        vms = Type.from_array('application/x-eruby', ['erb'], system='vms')
+        registry.add(erb, vms)
+        self.assertEqual(registry.remove(Type.from_array('application/x-eruby',
+                                                         ['erb', 'rhtml'])), [erb])
+        self.assertEqual(registry.type_for('a.erb'), [vms])
+        self.assertEqual(registry.type_for('a.rhtml'), [])
+        new = Type.from_array('application/x-eruby', ['erb'], system='vax')
+        self.assertEqual(registry.replace(vms, new), [vms])
+        self.assertEqual(registry['application/eruby'], [new])
+        self.assertEqual(registry.remove('application/x-eruby'), [new])
+        self.assertEqual(registry.remove('application/x-eruby'), [])
+        self.assertEqual((registry.type_variants, registry.sorted_types), ({}, []))
+
+    def test_class_urls(self):
+        registry = Types()
+        rfc = Type.from_array('text/x-urls', url=['RFC1'])
+        registry.add(rfc, Type.from_array('text/x-no-urls'))
+        self.assertEqual(registry.urls(),
+                         [(rfc, ('http://rfc-editor.org/rfc/rfc1.txt',))])
+        self.assertTrue(len(Types.urls()) > 100)
 
     def test_class_type_for(self):
         self.assertTrue(sorted(Types.type_for('xml')) == sorted(Types['text/xml'] + Types['application/xml']))
@@ -60,8 +240,46 @@ class TestMIMETypes(MIMETestBase):
         self.assertEqual(Types.of('gif', True), Types['image/gif'])
         self.assertEqual(Types.of('zzz'), [])
 
+    def test_class_type_for_paths(self):
+        png = Types['image/png']
+        self.assertEqual(Types.type_for('/srv/site.d/logo.PNG'), png)
+        self.assertEqual(Types.type_for('C:\\site.d\\logo.png'), png)
+        self.assertEqual(Types.type_for('.png'), [])
+        self.assertEqual(Types.type_for('site.d/.png'), [])
+        self.assertEqual(Types.type_for('..logo.png'), png)
+        self.assertEqual(Types.type_for('site.png/README'), [])
+        self.assertEqual(Types.type_for('logo.'), [])
+        self.assertEqual(Types.type_for('png'), png)
+
+    def test_class_type_for_compound(self):
+        bundle = Type.from_array('application/x-compound-bundle', ['bundle.gz'])
+        Types.add(bundle)
+        self.assertEqual(Types.type_for('data/a.b.BUNDLE.gz'), [bundle])
+        self.assertEqual(Types.type_for('a.other.gz'), Types.type_for('a.gz'))
+        self.assertEqual(Types.type_for('bundle.gz'), Types.type_for('a.gz'))
+        self.assertEqual(list(Types.type_for_many(['x.bundle.gz', 'y.gz'])),
+                         [('x.bundle.gz', (bundle,)),
+                          ('y.gz', tuple(Types.type_for('a.gz')))])
+
+    def test_class_type_for_many(self):
+        names = ['a.gif', 'b.GIF', 'c.xml', 'd.zzz', 'e.gif']
+        results = list(Types.type_for_many(iter(names)))
+        self.assertEqual([name for (name, types) in results], names)
+        for (name, types) in results:
+            self.assertEqual(list(types), Types.type_for(name))
+        self.assertTrue(results[0][1] is results[4][1])
+        Types['image/gif'][0].system = PLATFORM
+        self.assertEqual(list(Types.type_for_many(['a.gif'], True)),
+                         [('a.gif', tuple(Types['image/gif']))])
+
     def test_class_enumerable(self):
         self.assertTrue(Types.any(lambda t: t.content_type == 'text/plain'))
+        self.assertTrue(Types.any(lambda t: not t.extensions))
+        self.assertFalse(Types.all(lambda t: t.extensions))
+        seen = []
+        list(Types.each(seen.append))
+        self.assertEqual(len(seen), Types.count())
+        self.assertEqual(len(set(map(id, seen))), len(seen))
 
     def test_class_count(self):
         self.assertTrue(Types.count() > 42,
@@ -76,6 +294,23 @@ class TestMIMETypes(MIMETestBase):
         self.assertEqual(Types['application/x-apple-diskimage'],
                          Types.type_for('disk.dmg'))
 
+    def test_parse_header(self):
+        (html, params) = Types.parse_header('text/html; charset=UTF-8')
+        self.assertEqual(html, Types['text/html'][0])
+        self.assertEqual(params, {'charset': 'UTF-8'})
+        (png, params) = Types.parse_header('image/png')
+        self.assertEqual(png, Types['image/png'][0])
+        self.assertEqual(params, {})
+        self.assertEqual(Types.parse_header('x-foo/x-bar; a=b'), (None, {'a': 'b'}))
+        self.assertRaises(InvalidHeader, Types.parse_header, 'html')
+        self.assertRaises(InvalidHeader, Types.parse_header, 'html; a=b')
+        self.assertEqual(Types.parse_header(' text/html ')[0], html)
+        self.assertEqual(Types.parse_header('text/plain!'), (None, {}))
+        self.assertEqual(Types.parse_header('text/plain!; a=b'), (None, {'a': 'b'}))
+        for header in ('text/html, foo', 'text/html garbage', 'text/',
+                       'text/html garbage; a=b'):
+            self.assertRaises(InvalidHeader, Types.parse_header, header)
+
     def _test_add(self):
         'Need to write test_add'
 
@@ -95,5 +330,59 @@ class TestMIMETypes(MIMETestBase):
         'Need to write test_of'
 
 
+class TestOverlay(MIMETestBase):
+
+    def setUp(self):
+        self.site = Types()
+        self.site_html = Type.from_array('text/x-site', ['html', 'site'])
+        self.site_plain = Type.from_array('text/plain', ['txt'], '8bit', 'vms')
+        self.site.add(self.site_html, self.site_plain)
+        self.overlay = Overlay(self.site, Types)
+
+    def test_lookups_resolve_top_first(self):
+        overlay = self.overlay
+        self.assertEqual(overlay.type_for('index.html'), [self.site_html])
+        self.assertEqual(overlay['text/plain'], [self.site_plain])
+        self.assertEqual(overlay.type_for('logo.png'), Types.type_for('logo.png'))
+        self.assertEqual(overlay['image/png'], Types['image/png'])
+        self.assertEqual(overlay['text/unknown'], None)
+        self.assertEqual(Types.type_for('index.site'), [])
+
+    def test_queries_see_all_layers(self):
+        overlay = self.overlay
+        self.assertTrue('text/site' in overlay.media_type_index['text'])
+        self.assertTrue('text/html' in overlay.media_type_index['text'])
+        self.assertEqual([str(t) for t in overlay.glob('text/site')],
+                         ['text/x-site'])
+        self.assertEqual(overlay.count(), Types.count() + 1 -
+                         len(Types['text/plain']) + 1)
+        self.assertEqual(overlay.sorted_types, sorted(overlay.type_variants))
+        self.assertEqual(overlay.count(), len(list(overlay.defined_types())))
+
+    def test_overlay_as_base(self):
+        overlay = self.overlay
+        tenant = Types(base=overlay)
+        extra = Type.from_array('text/x-tenant-extra', ['tenx'])
+        tenant.add(extra)
+        self.assertEqual(tenant.type_for('a.tenx'), [extra])
+        for name in ('index.html', 'a.txt', 'logo.png', 'a.doc'):
+            self.assertEqual(tenant.type_for(name), overlay.type_for(name))
+        self.assertEqual(tenant['text/plain'], [self.site_plain])
+        self.assertEqual(tenant.count(), overlay.count() + 1)
+        self.assertEqual(overlay.type_for('a.tenx'), [])
+
+    def test_changes_invalidate_cached_results(self):
+        overlay = self.overlay
+        self.assertEqual(overlay.type_for('a.ovl'), [])
+        index = overlay._index
+        self.assertTrue(overlay._index is index)
+        rich = Type.from_array('text/x-overlay-rich', ['ovl'])
+        overlay.add(rich)
+        self.assertFalse(overlay._index is index)
+        self.assertEqual(overlay.type_for('a.ovl'), [rich])
+        self.assertEqual(self.site.type_for('a.ovl'), [rich])
+        self.assertEqual(Types.type_for('a.ovl'), [])
+
+
 if __name__ == '__main__':
     main()